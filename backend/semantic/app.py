@@ -1,9 +1,13 @@
 """FastAPI application for Personal Drive Python Service."""
 
+import asyncio
+import functools
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Annotated
 from fastapi import FastAPI, Depends, Query, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 
 # Import configuration and authentication
 from config import Config
@@ -30,7 +34,15 @@ from models.schemas import (
     HealthResponse,
     StatsResponse,
     APIInfoResponse,
+    IndexRequest,
+    IndexResponse,
+    IndexBulkRequest,
+    IndexBulkResponse,
+    IndexSearchRequest,
+    IndexSearchResponse,
+    SearchResponseAdapter,
 )
+from utils.validators import validate_file_id, validate_search_query
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -40,18 +52,49 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Personal Drive Python Service",
     description="Unified backend service for file management and semantic search",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Initialize services (will be initialized on startup)
 file_service: FileService = None
 semantic_indexer: SemanticIndexer = None
+# Worker pool for blocking service calls (model, FAISS, Appwrite, S3)
+cpu_pool: ThreadPoolExecutor = None
+# Index file paths reported by /stats, bound once at startup
+_INDEX_PATH: str = None
+_META_PATH: str = None
+
+
+def configure_torch_threads():
+    """Size torch's thread pools so uvicorn workers do not oversubscribe cores."""
+    try:
+        import torch
+    except ImportError:
+        return
+
+    num_threads = Config.TORCH_NUM_THREADS or max(
+        1, (os.cpu_count() or 1) // max(1, Config.UVICORN_WORKERS)
+    )
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before torch runs any parallel work
+        logger.warning("Torch inter-op threads already initialized, leaving as is")
+    logger.info(f"Torch using {num_threads} intra-op threads")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking service call on the worker pool, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_pool, functools.partial(func, *args, **kwargs))
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
-    global file_service, semantic_indexer
+    global file_service, semantic_indexer, cpu_pool, _INDEX_PATH, _META_PATH
 
     # Validate configuration
     if not Config.validate():
@@ -59,50 +102,71 @@ async def startup_event():
         raise RuntimeError("Configuration validation failed")
 
     logger.info("Initializing services...")
+    configure_torch_threads()
+    cpu_pool = ThreadPoolExecutor(
+        max_workers=Config.WORKER_THREADS, thread_name_prefix="service-worker"
+    )
     file_service = FileService()
-    semantic_indexer = SemanticIndexer()
+    # Share the file service's indexer so only one model and index are loaded
+    semantic_indexer = file_service.semantic_indexer
+    _INDEX_PATH = Config.get_index_path()
+    _META_PATH = Config.get_meta_path()
     logger.info("Services initialized successfully")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers on shutdown."""
+    if cpu_pool is not None:
+        cpu_pool.shutdown(wait=True)
+    if semantic_indexer is not None:
+        semantic_indexer.close()
+
+
 # ==================== System Endpoints ====================
 
+# Static, so validated once at import instead of on every request
+_ROOT_PAYLOAD = APIInfoResponse(
+    service="Personal Drive Python Service",
+    status="running",
+    endpoints={
+        "health": "/health",
+        "stats": "/stats",
+        "upload": {
+            "presign": "/api/v1/upload/presign",
+            "complete": "/api/v1/upload/complete"
+        },
+        "files": {
+            "list": "/api/v1/files",
+            "get": "/api/v1/files/{file_id}",
+            "update": "/api/v1/files/{file_id}",
+            "delete": "/api/v1/files/{file_id}",
+            "download": "/api/v1/files/{file_id}/download"
+        },
+        "search": "/api/v1/search"
+    },
+    docs="/docs",
+).model_dump()
+
+
 @app.get("/", response_model=APIInfoResponse)
 async def root():
     """Root endpoint with API information."""
-    return {
-        "service": "Personal Drive Python Service",
-        "status": "running",
-        "endpoints": {
-            "health": "/health",
-            "stats": "/stats",
-            "upload": {
-                "presign": "/api/v1/upload/presign",
-                "complete": "/api/v1/upload/complete"
-            },
-            "files": {
-                "list": "/api/v1/files",
-                "get": "/api/v1/files/{file_id}",
-                "update": "/api/v1/files/{file_id}",
-                "delete": "/api/v1/files/{file_id}",
-                "download": "/api/v1/files/{file_id}/download"
-            },
-            "search": "/api/v1/search"
-        },
-        "docs": "/docs"
-    }
+    return ORJSONResponse(_ROOT_PAYLOAD)
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
     stats = semantic_indexer.get_stats()
-    return {
+    # Fields match HealthResponse; returned directly to skip re-validation
+    return ORJSONResponse({
         "status": "ok",
-        "model_loaded": semantic_indexer.model is not None,
+        "model_loaded": semantic_indexer.model_loaded,
         "index_initialized": semantic_indexer.index is not None,
         "index_size": stats["index_size"],
         "documents_indexed": stats["documents_indexed"],
-    }
+    })
 
 
 @app.get("/stats", response_model=StatsResponse)
@@ -114,13 +178,58 @@ async def get_stats(api_key: Annotated[str, Depends(verify_api_key)]):
         "embedding_dimension": stats["embedding_dimension"],
         "index_size": stats["index_size"],
         "documents_indexed": stats["documents_indexed"],
-        "index_path": Config.get_index_path(),
-        "meta_path": Config.get_meta_path(),
+        "index_path": _INDEX_PATH,
+        "meta_path": _META_PATH,
+        "query_cache": stats["query_cache"],
     }
 
 
 # ==================== File Upload Endpoints ====================
 
+# FileMetadata fields every listed row must carry, and the optional ones with
+# the value used when a row lacks them
+_REQUIRED_FILE_FIELDS = tuple(
+    name for name, field in FileMetadata.model_fields.items() if field.is_required()
+)
+_OPTIONAL_FILE_FIELD_DEFAULTS = {
+    name: field.get_default(call_default_factory=True)
+    for name, field in FileMetadata.model_fields.items()
+    if not field.is_required()
+}
+
+
+def list_files_payload(result: dict) -> dict:
+    """
+    Shape a listing like ListFilesResponse without per-row model validation.
+
+    Rows come from Appwrite already JSON-friendly; only the FileMetadata
+    fields are kept so Appwrite system fields do not leak to clients. Rows
+    missing a required field would violate the response model, so they are
+    logged and left out instead.
+    """
+    files = []
+    for row in result["files"]:
+        missing = [name for name in _REQUIRED_FILE_FIELDS if row.get(name) is None]
+        if missing:
+            logger.warning(
+                f"Skipping file row {row.get('fileId') or row.get('$id')} "
+                f"missing required fields: {', '.join(missing)}"
+            )
+            continue
+        files.append({
+            name: row.get(name, _OPTIONAL_FILE_FIELD_DEFAULTS.get(name))
+            for name in FileMetadata.model_fields
+        })
+
+    return {
+        "files": files,
+        "total": result["total"],
+        "limit": result["limit"],
+        "offset": result["offset"],
+        "nextCursor": result.get("nextCursor"),
+    }
+
+
 @app.post("/api/v1/upload/presign", response_model=PresignUploadResponse)
 async def presign_upload(
     request: PresignUploadRequest,
@@ -129,7 +238,8 @@ async def presign_upload(
 ):
     """Generate presigned URL for file upload."""
     try:
-        result = file_service.presign_upload(
+        result = await run_blocking(
+            file_service.presign_upload,
             user_id=user_id,
             name=request.name,
             size=request.size,
@@ -159,7 +269,8 @@ async def complete_upload(
 ):
     """Complete file upload, extract text, and index."""
     try:
-        result = file_service.complete_upload(
+        result = await run_blocking(
+            file_service.complete_upload,
             user_id=user_id,
             file_id=request.fileId,
         )
@@ -184,17 +295,32 @@ async def list_files(
     offset: int = Query(0, ge=0),
     folderId: str = Query(None),
     mimeType: str = Query(None),
+    cursor: str = Query(None),
+    paginate: str = Query(None, pattern="^(offset|cursor)$"),
 ):
-    """List user's files with pagination."""
+    """List user's files with offset or cursor pagination."""
     try:
-        result = file_service.list_files(
-            user_id=user_id,
-            limit=limit,
-            offset=offset,
-            folder_id=folderId,
-            mime_type=mimeType,
-        )
-        return result
+        if cursor or paginate == "cursor":
+            result = await run_blocking(
+                file_service.list_files_after,
+                user_id=user_id,
+                cursor=cursor,
+                limit=limit,
+                folder_id=folderId,
+                mime_type=mimeType,
+            )
+        else:
+            result = await run_blocking(
+                file_service.list_files,
+                user_id=user_id,
+                limit=limit,
+                offset=offset,
+                folder_id=folderId,
+                mime_type=mimeType,
+            )
+        return ORJSONResponse(list_files_payload(result))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list files: {e}")
         raise HTTPException(
@@ -211,7 +337,7 @@ async def get_file(
 ):
     """Get file metadata by ID."""
     try:
-        result = file_service.get_file(user_id=user_id, file_id=file_id)
+        result = await run_blocking(file_service.get_file, user_id=user_id, file_id=file_id)
         return result
     except HTTPException:
         raise
@@ -232,7 +358,8 @@ async def update_file(
 ):
     """Update file metadata."""
     try:
-        result = file_service.update_file(
+        result = await run_blocking(
+            file_service.update_file,
             user_id=user_id,
             file_id=file_id,
             name=request.name,
@@ -259,7 +386,7 @@ async def delete_file(
 ):
     """Delete a file and its metadata."""
     try:
-        result = file_service.delete_file(user_id=user_id, file_id=file_id)
+        result = await run_blocking(file_service.delete_file, user_id=user_id, file_id=file_id)
         return result
     except HTTPException:
         raise
@@ -280,7 +407,8 @@ async def get_download_url(
 ):
     """Get presigned download URL for a file."""
     try:
-        result = file_service.get_download_url(
+        result = await run_blocking(
+            file_service.get_download_url,
             user_id=user_id,
             file_id=file_id,
             expires_in=expiresIn,
@@ -306,13 +434,19 @@ async def search(
 ):
     """Perform semantic search across user's files."""
     try:
-        result = file_service.search_files(
+        result = await run_blocking(
+            file_service.search_files,
             user_id=user_id,
             query=request.query,
             k=request.k,
             folder_id=request.folderId,
+            threshold=request.threshold,
+        )
+        # Validate and serialize all results in one pydantic-core pass
+        return Response(
+            content=SearchResponseAdapter.dump_json(SearchResponseAdapter.validate_python(result)),
+            media_type="application/json",
         )
-        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -323,12 +457,111 @@ async def search(
         )
 
 
+# ==================== Direct Index Endpoints ====================
+
+@app.post("/index", response_model=IndexResponse)
+async def index_text(
+    request: IndexRequest,
+    api_key: Annotated[str, Depends(verify_api_key)],
+):
+    """Index raw text under a file ID without touching file metadata."""
+    file_id = validate_file_id(request.file_id)
+    if not request.text or not request.text.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Text cannot be empty"
+        )
+
+    already_indexed = file_id in semantic_indexer.id_map
+    try:
+        vector_id = await run_blocking(semantic_indexer.index_document, file_id, request.text)
+    except Exception as e:
+        logger.error(f"Indexing failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Indexing failed"
+        )
+    return {
+        "file_id": file_id,
+        "vector_id": vector_id,
+        "status": "already_indexed" if already_indexed else "indexed",
+    }
+
+
+@app.post("/index_bulk", response_model=IndexBulkResponse)
+async def index_text_bulk(
+    request: IndexBulkRequest,
+    api_key: Annotated[str, Depends(verify_api_key)],
+):
+    """Index several texts with one encode pass and one index update."""
+    documents = []
+    for doc in request.docs:
+        file_id = validate_file_id(doc.file_id)
+        if not doc.text or not doc.text.strip():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Text cannot be empty (file_id: {file_id})"
+            )
+        documents.append((file_id, doc.text))
+
+    already_indexed = [file_id in semantic_indexer.id_map for file_id, _ in documents]
+    try:
+        vector_ids = await run_blocking(semantic_indexer.index_documents, documents)
+    except Exception as e:
+        logger.error(f"Bulk indexing failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Indexing failed"
+        )
+    return {
+        "results": [
+            {
+                "file_id": file_id,
+                "vector_id": vector_id,
+                "status": "already_indexed" if existed else "indexed",
+            }
+            for (file_id, _), vector_id, existed in zip(documents, vector_ids, already_indexed)
+        ]
+    }
+
+
+@app.post("/search", response_model=IndexSearchResponse)
+async def search_index(
+    request: IndexSearchRequest,
+    api_key: Annotated[str, Depends(verify_api_key)],
+):
+    """Search the index directly, returning matching file IDs and scores."""
+    query = validate_search_query(request.query)
+    if request.k <= 0 or request.k > 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="k must be between 1 and 100"
+        )
+
+    try:
+        matches = await run_blocking(
+            semantic_indexer.search, query, request.k, threshold=request.threshold
+        )
+    except Exception as e:
+        logger.error(f"Search failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Search failed"
+        )
+    return {
+        "results": [file_id for file_id, _ in matches],
+        "scores": [score for _, score in matches],
+        "query": query,
+        "total": len(matches),
+    }
+
+
 # ==================== Error Handlers ====================
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc: HTTPException):
     """Handle HTTP exceptions."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail}
     )
@@ -338,7 +571,7 @@ async def http_exception_handler(request, exc: HTTPException):
 async def general_exception_handler(request, exc: Exception):
     """Handle general exceptions."""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "Internal server error"}
     )
@@ -1,5 +1,6 @@
 """Authentication utilities for API key validation."""
 
+import hmac
 import logging
 from fastapi import Header, HTTPException, status
 from typing import Annotated
@@ -8,6 +9,9 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Encoded once so each request only encodes the supplied key
+_API_KEY_BYTES = Config.API_KEY.encode("utf-8")
+
 
 async def verify_api_key(
     x_api_key: Annotated[str, Header(alias="X-API-Key")]
@@ -24,7 +28,7 @@ async def verify_api_key(
     Raises:
         HTTPException: If API key is invalid or missing
     """
-    if x_api_key != Config.API_KEY:
+    if not hmac.compare_digest(x_api_key.encode("utf-8"), _API_KEY_BYTES):
         logger.warning(f"Invalid API key attempt: {x_api_key[:10]}...")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
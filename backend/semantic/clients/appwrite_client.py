@@ -1,21 +1,111 @@
 """Appwrite Tables API client for metadata operations."""
 
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any, List
-from appwrite.client import Client
-from appwrite.services.tables_db import TablesDB
-from appwrite.query import Query
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Callable, Hashable
+import httpx
+import orjson
+from cachetools import TTLCache
 from appwrite.exception import AppwriteException
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import Config
 
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# One pooled HTTP client per process, shared by every AppwriteClient so
+# concurrent requests reuse keep-alive connections instead of reconnecting.
+# With HTTP/2 they are multiplexed over a single warm connection.
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+# Appwrite JSON query strings, as produced by the SDK's Query helpers.
+# Fixed parts are preformatted so only the values are encoded per call.
+_LIMIT_TMPL = '{"method":"limit","values":[%d]}'
+_OFFSET_TMPL = '{"method":"offset","values":[%d]}'
+_ORDER_DESC_CREATED_AT = '{"method":"orderDesc","attribute":"$createdAt"}'
+
+
+def _eq(attribute: str, values: List[Any]) -> str:
+    """Build an equal query matching any of values."""
+    return f'{{"method":"equal","attribute":"{attribute}","values":{orjson.dumps(values).decode()}}}'
+
+
+def _limit(limit: int) -> str:
+    """Build a limit query."""
+    return _LIMIT_TMPL % limit
+
+
+def _offset(offset: int) -> str:
+    """Build an offset query."""
+    return _OFFSET_TMPL % offset
+
+
+def _cursor_after(row_id: str) -> str:
+    """Build a cursorAfter query."""
+    return f'{{"method":"cursorAfter","values":[{orjson.dumps(row_id).decode()}]}}'
+
+
+# Row metadata fields merged into the row data: (response key, data key)
+_META_KEYS = (("_createdAt", "createdAt"), ("_updatedAt", "updatedAt"), ("_id", "_id"))
+
+
+def _flatten_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge a row's metadata fields into its data.
+
+    Args:
+        row: Row object from the Tables API
+
+    Returns:
+        Row data with metadata fields, or the row itself if it has neither
+    """
+    row_data = row.get("data", {})
+    for source, target in _META_KEYS:
+        if source in row:
+            row_data[target] = row[source]
+    return row_data if row_data else row
+
+
+# Cached entries older than this fraction of their TTL are served but
+# refreshed in the background (stale-while-revalidate)
+_REFRESH_AFTER = 0.8
+
+
+def _get_http_client() -> httpx.Client:
+    """Get the shared pooled HTTP client for the Appwrite REST API."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                base_url=Config.APPWRITE_ENDPOINT,
+                headers={
+                    "X-Appwrite-Project": Config.APPWRITE_PROJECT_ID,
+                    "X-Appwrite-Key": Config.APPWRITE_API_KEY,
+                    "Content-Type": "application/json",
+                },
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=32,
+                    keepalive_expiry=60.0,
+                ),
+                timeout=httpx.Timeout(30.0),
+            )
+            if not HTTP2_AVAILABLE:
+                logger.info("h2 not installed, using HTTP/1.1 for Appwrite requests")
+        return _http_client
+
 
 class AppwriteClient:
     """
@@ -37,18 +127,137 @@ class AppwriteClient:
     - tags (string array, 500): Optional list of tags
     - indexed (boolean, default: false): Whether file is indexed for semantic search
     - vectorId (string, 255): FAISS vector index identifier
-    - hash (string, 64): SHA-256 hash for deduplication
+    - hash (string, 64): Content hash for deduplication (SHA-256 hex or "b3:" + BLAKE3)
     - storagePath (string, 500): S3 storage path/key
     - status (string, 50, default: "pending"): File status (pending/completed)
     """
 
     def __init__(self):
         """Initialize Appwrite client with configuration."""
-        self.client = Client()
-        self.client.set_endpoint(Config.APPWRITE_ENDPOINT)
-        self.client.set_project(Config.APPWRITE_PROJECT_ID)
-        self.client.set_key(Config.APPWRITE_API_KEY)
-        self.tables_db = TablesDB(self.client)
+        self.http = _get_http_client()
+        # Settings read on every call are bound once here
+        self.metadata_cache_ttl = Config.METADATA_CACHE_TTL
+        self.list_cache_ttl = Config.LIST_CACHE_TTL
+        self.rows_path = (
+            f"/tablesdb/{Config.APPWRITE_DATABASE_ID}"
+            f"/tables/{Config.APPWRITE_TABLE_ID}/rows"
+        )
+        # Read caches: key → (fetched_at, value)
+        self._meta_cache = TTLCache(
+            maxsize=max(Config.METADATA_CACHE_SIZE, 1), ttl=max(self.metadata_cache_ttl, 1)
+        )
+        self._list_cache = TTLCache(
+            maxsize=max(Config.LIST_CACHE_SIZE, 1), ttl=max(self.list_cache_ttl, 1)
+        )
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0  # Bumped on invalidation to drop in-flight fetches
+        self._refreshing: set = set()
+
+    def _cached(
+        self,
+        cache: TTLCache,
+        ttl: int,
+        key: Hashable,
+        fetch: Callable[[], Any],
+    ) -> Any:
+        """
+        Serve a read from cache, refreshing near-expiry entries in the background.
+
+        Args:
+            cache: Cache to use
+            ttl: Cache TTL in seconds (0 disables caching)
+            key: Cache key
+            fetch: Function loading the value from Appwrite
+
+        Returns:
+            Cached or freshly fetched value
+        """
+        if ttl <= 0:
+            return fetch()
+
+        with self._cache_lock:
+            entry = cache.get(key)
+            generation = self._cache_generation
+        if entry is not None:
+            fetched_at, value = entry
+            if time.monotonic() - fetched_at > ttl * _REFRESH_AFTER:
+                self._refresh_in_background(cache, key, fetch)
+            return value
+
+        value = fetch()
+        self._store(cache, key, value, generation)
+        return value
+
+    def _store(self, cache: TTLCache, key: Hashable, value: Any, generation: int):
+        """Cache a fetched value unless the cache was invalidated meanwhile."""
+        if value is None:
+            return
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                cache[key] = (time.monotonic(), value)
+
+    def _refresh_in_background(self, cache: TTLCache, key: Hashable, fetch: Callable[[], Any]):
+        """Re-fetch a stale entry on a daemon thread, once per key at a time."""
+        with self._cache_lock:
+            if (id(cache), key) in self._refreshing:
+                return
+            self._refreshing.add((id(cache), key))
+            generation = self._cache_generation
+
+        def refresh():
+            try:
+                self._store(cache, key, fetch(), generation)
+            except Exception as e:
+                logger.warning(f"Background cache refresh failed: {e}")
+            finally:
+                with self._cache_lock:
+                    self._refreshing.discard((id(cache), key))
+
+        threading.Thread(target=refresh, name="appwrite-cache-refresh", daemon=True).start()
+
+    def _invalidate(self, file_id: str):
+        """Drop cached reads affected by a change to file_id."""
+        with self._cache_lock:
+            self._cache_generation += 1
+            self._meta_cache.pop(file_id, None)
+            # Listings are keyed by user and filters, not file; clear them all
+            self._list_cache.clear()
+
+    def _request(self, method: str, path: str = "", **kwargs) -> Dict[str, Any]:
+        """
+        Send a request to the table's rows endpoint.
+
+        Args:
+            method: HTTP method
+            path: Path below the rows endpoint, e.g. "/{row_id}"
+            **kwargs: Passed to httpx (json, params)
+
+        Returns:
+            Decoded JSON response body ({} for empty responses)
+
+        Raises:
+            AppwriteException: If the request fails or Appwrite returns an error
+        """
+        try:
+            response = self.http.request(method, self.rows_path + path, **kwargs)
+        except httpx.HTTPError as e:
+            raise AppwriteException(str(e)) from e
+
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            raise AppwriteException(
+                body.get("message", response.text),
+                response.status_code,
+                body.get("type"),
+                response.text,
+            )
+
+        if not response.content:
+            return {}
+        return response.json()
 
     def create_file_metadata(
         self,
@@ -86,10 +295,18 @@ class AppwriteClient:
         Raises:
             AppwriteException: If creation fails
         """
+        # Validate file_id length (Appwrite requires max 36 chars)
+        if len(file_id) > 36:
+            raise ValueError(
+                f"File ID '{file_id}' is too long ({len(file_id)} chars). "
+                f"Appwrite rowId must be max 36 characters."
+            )
+
         try:
             # Get current datetime in ISO 8601 format for createdAt field
-            current_time = datetime.utcnow().isoformat() + "Z"
-            
+            # (required by the table schema; reads report the server's _createdAt)
+            current_time = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
             data = {
                 "fileId": file_id,
                 "userId": user_id,
@@ -100,46 +317,25 @@ class AppwriteClient:
                 "indexed": False,
                 "status": "pending",
                 "createdAt": current_time,  # Required by table schema
+                # Optional columns are only sent when non-empty
+                **{
+                    key: value
+                    for key, value in (
+                        ("folderId", folder_id),
+                        ("description", description),
+                        ("tags", tags),
+                    )
+                    if value
+                },
             }
 
-            if folder_id:
-                data["folderId"] = folder_id
-            if description:
-                data["description"] = description
-            if tags:
-                data["tags"] = tags
-
-            # Validate file_id length (Appwrite requires max 36 chars)
-            if len(file_id) > 36:
-                raise ValueError(
-                    f"File ID '{file_id}' is too long ({len(file_id)} chars). "
-                    f"Appwrite rowId must be max 36 characters."
-                )
-            
             # Use Tables API (create_row) instead of deprecated Databases API
-            result = self.tables_db.create_row(
-                database_id=Config.APPWRITE_DATABASE_ID,
-                table_id=Config.APPWRITE_TABLE_ID,
-                row_id=file_id,
-                data=data
-            )
+            result = self._request("POST", json={"rowId": file_id, "data": data})
 
+            self._invalidate(file_id)
             logger.info(f"Created file metadata for {file_id}")
             # Tables API returns row object with _id, _createdAt, _updatedAt, _permissions, and data fields
-            # The data field contains the actual row data
-            if isinstance(result, dict):
-                # Extract data from row response
-                row_data = result.get("data", {})
-                # Merge with metadata fields from row response
-                if "_createdAt" in result:
-                    row_data["createdAt"] = result["_createdAt"]
-                if "_updatedAt" in result:
-                    row_data["updatedAt"] = result["_updatedAt"]
-                if "_id" in result:
-                    row_data["_id"] = result["_id"]
-                # Return the merged data
-                return row_data if row_data else result
-            return result
+            return _flatten_row(result) if isinstance(result, dict) else result
 
         except AppwriteException as e:
             logger.error(f"Failed to create file metadata: {e.message}")
@@ -147,7 +343,24 @@ class AppwriteClient:
 
     def get_file_metadata(self, file_id: str) -> Optional[Dict[str, Any]]:
         """
-        Get file metadata by ID.
+        Get file metadata by ID, served from a short-lived cache.
+
+        Args:
+            file_id: File ID to retrieve
+
+        Returns:
+            File metadata record or None if not found
+        """
+        return self._cached(
+            self._meta_cache,
+            self.metadata_cache_ttl,
+            file_id,
+            lambda: self._fetch_file_metadata(file_id),
+        )
+
+    def _fetch_file_metadata(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch file metadata by ID from Appwrite.
 
         Args:
             file_id: File ID to retrieve
@@ -156,31 +369,61 @@ class AppwriteClient:
             File metadata record or None if not found
         """
         try:
-            result = self.tables_db.get_row(
-                database_id=Config.APPWRITE_DATABASE_ID,
-                table_id=Config.APPWRITE_TABLE_ID,
-                row_id=file_id
-            )
+            result = self._request("GET", f"/{file_id}")
             # Tables API returns row object with _id, _createdAt, _updatedAt, _permissions, and data fields
-            if isinstance(result, dict):
-                # Extract data from row response
-                row_data = result.get("data", {})
-                # Merge with metadata fields from row response
-                if "_createdAt" in result:
-                    row_data["createdAt"] = result["_createdAt"]
-                if "_updatedAt" in result:
-                    row_data["updatedAt"] = result["_updatedAt"]
-                if "_id" in result:
-                    row_data["_id"] = result["_id"]
-                # Return the merged data
-                return row_data if row_data else result
-            return result
+            return _flatten_row(result) if isinstance(result, dict) else result
         except AppwriteException as e:
             if e.code == 404:
                 return None
             logger.error(f"Failed to get file metadata: {e.message}")
             raise
 
+    def get_many_file_metadata(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get metadata for several files, with one query per 100 uncached IDs.
+
+        Args:
+            file_ids: File IDs to retrieve
+
+        Returns:
+            Dictionary mapping each found file ID to its metadata record
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        with self._cache_lock:
+            generation = self._cache_generation
+            for file_id in dict.fromkeys(file_ids):
+                entry = self._meta_cache.get(file_id) if self.metadata_cache_ttl > 0 else None
+                if entry is not None:
+                    found[file_id] = entry[1]
+                else:
+                    missing.append(file_id)
+
+        try:
+            # Row IDs are the file IDs; Appwrite accepts 100 values per query
+            for start in range(0, len(missing), 100):
+                chunk = missing[start:start + 100]
+                queries = [
+                    _eq("$id", chunk),
+                    _limit(len(chunk))
+                ]
+                rows = self._request("GET", params={"queries[]": queries}).get("rows", [])
+                for row in rows:
+                    record = _flatten_row(row)
+                    file_id = record.get("fileId")
+                    found[file_id] = record
+                    if self.metadata_cache_ttl > 0:
+                        self._store(self._meta_cache, file_id, record, generation)
+        except AppwriteException as e:
+            # Fall back to concurrent single reads if the bulk query is rejected
+            logger.warning(f"Bulk metadata query failed, fetching individually: {e.message}")
+            remaining = [file_id for file_id in missing if file_id not in found]
+            with ThreadPoolExecutor(max_workers=min(16, max(1, len(remaining)))) as executor:
+                for file_id, record in zip(remaining, executor.map(self.get_file_metadata, remaining)):
+                    if record:
+                        found[file_id] = record
+        return found
+
     def list_files(
         self,
         user_id: str,
@@ -190,7 +433,35 @@ class AppwriteClient:
         mime_type: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        List files for a user with optional filtering.
+        List files for a user with optional filtering, served from a short-lived cache.
+
+        Args:
+            user_id: User ID to filter by
+            limit: Maximum number of results
+            offset: Pagination offset
+            folder_id: Optional folder ID filter
+            mime_type: Optional MIME type filter
+
+        Returns:
+            Dictionary with files list and pagination info
+        """
+        return self._cached(
+            self._list_cache,
+            self.list_cache_ttl,
+            (user_id, folder_id, mime_type, limit, offset),
+            lambda: self._fetch_files(user_id, limit, offset, folder_id, mime_type),
+        )
+
+    def _fetch_files(
+        self,
+        user_id: str,
+        limit: int,
+        offset: int,
+        folder_id: Optional[str],
+        mime_type: Optional[str],
+    ) -> Dict[str, Any]:
+        """
+        Fetch a page of a user's files from Appwrite.
 
         Args:
             user_id: User ID to filter by
@@ -203,41 +474,18 @@ class AppwriteClient:
             Dictionary with files list and pagination info
         """
         try:
-            # Build queries using Query objects
-            queries = [
-                Query.equal("userId", [user_id])
-            ]
-
-            if folder_id:
-                queries.append(Query.equal("folderId", [folder_id]))
-            if mime_type:
-                queries.append(Query.equal("mimeType", [mime_type]))
-            
-            # Add pagination using Query objects
-            queries.append(Query.limit(limit))
-            queries.append(Query.offset(offset))
-
-            result = self.tables_db.list_rows(
-                Config.APPWRITE_DATABASE_ID,
-                Config.APPWRITE_TABLE_ID,
-                queries
-            )
+            # Build filter queries
+            queries = self._file_filters(user_id, folder_id, mime_type)
+
+            # Add pagination
+            queries.append(_limit(limit))
+            queries.append(_offset(offset))
+
+            result = self._request("GET", params={"queries[]": queries})
 
             # Tables API returns rows array, extract data from each row
             rows = result.get("rows", [])
-            files = []
-            for row in rows:
-                # Extract data from row response
-                row_data = row.get("data", {})
-                # Merge with metadata fields from row response
-                if "_createdAt" in row:
-                    row_data["createdAt"] = row["_createdAt"]
-                if "_updatedAt" in row:
-                    row_data["updatedAt"] = row["_updatedAt"]
-                if "_id" in row:
-                    row_data["_id"] = row["_id"]
-                # Use row_data if available, otherwise use the full row
-                files.append(row_data if row_data else row)
+            files = [_flatten_row(row) for row in rows]
 
             return {
                 "files": files,
@@ -249,6 +497,101 @@ class AppwriteClient:
             logger.error(f"Failed to list files: {e.message}")
             raise
 
+    def list_files_after(
+        self,
+        user_id: str,
+        cursor_id: Optional[str] = None,
+        limit: int = 50,
+        folder_id: Optional[str] = None,
+        mime_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        List files for a user with keyset (cursor) pagination, newest first.
+
+        Unlike offset pagination, Appwrite does not scan the skipped rows, so
+        deep pages cost the same as the first one.
+
+        Args:
+            user_id: User ID to filter by
+            cursor_id: Row ID of the last file of the previous page (None for the first page)
+            limit: Maximum number of results
+            folder_id: Optional folder ID filter
+            mime_type: Optional MIME type filter
+
+        Returns:
+            Dictionary with files list, pagination info and nextCursor
+            (None when there are no more files)
+        """
+        return self._cached(
+            self._list_cache,
+            self.list_cache_ttl,
+            ("after", user_id, folder_id, mime_type, limit, cursor_id),
+            lambda: self._fetch_files_after(user_id, cursor_id, limit, folder_id, mime_type),
+        )
+
+    def _fetch_files_after(
+        self,
+        user_id: str,
+        cursor_id: Optional[str],
+        limit: int,
+        folder_id: Optional[str],
+        mime_type: Optional[str],
+    ) -> Dict[str, Any]:
+        """
+        Fetch the page of a user's files following cursor_id from Appwrite.
+
+        Args:
+            user_id: User ID to filter by
+            cursor_id: Row ID to continue after, or None
+            limit: Maximum number of results
+            folder_id: Optional folder ID filter
+            mime_type: Optional MIME type filter
+
+        Returns:
+            Dictionary with files list, pagination info and nextCursor
+        """
+        try:
+            queries = self._file_filters(user_id, folder_id, mime_type)
+            queries.append(_ORDER_DESC_CREATED_AT)
+            queries.append(_limit(limit))
+            if cursor_id:
+                queries.append(_cursor_after(cursor_id))
+
+            result = self._request("GET", params={"queries[]": queries})
+
+            rows = result.get("rows", [])
+            files = [_flatten_row(row) for row in rows]
+
+            # Row IDs are the file IDs; a short page means nothing follows
+            next_cursor = files[-1].get("fileId") if len(files) == limit else None
+            return {
+                "files": files,
+                "total": result.get("total", 0),
+                "limit": limit,
+                "offset": 0,
+                "nextCursor": next_cursor,
+            }
+        except AppwriteException as e:
+            logger.error(f"Failed to list files: {e.message}")
+            raise
+
+    @staticmethod
+    def _file_filters(
+        user_id: str,
+        folder_id: Optional[str],
+        mime_type: Optional[str],
+    ) -> List[str]:
+        """Build the user, folder and MIME type filter queries for a listing."""
+        queries = [
+            _eq("userId", [user_id])
+        ]
+
+        if folder_id:
+            queries.append(_eq("folderId", [folder_id]))
+        if mime_type:
+            queries.append(_eq("mimeType", [mime_type]))
+        return queries
+
     def update_file_metadata(
         self,
         file_id: str,
@@ -285,56 +628,35 @@ class AppwriteClient:
             Updated file metadata record
         """
         try:
-            data = {}
-            if name is not None:
-                data["name"] = name
-            if description is not None:
-                data["description"] = description
-            if tags is not None:
-                data["tags"] = tags
-            if folder_id is not None:
-                data["folderId"] = folder_id
-            if indexed is not None:
-                data["indexed"] = indexed
-            if hash is not None:
-                data["hash"] = hash
-            if status is not None:
-                data["status"] = status
-            if vector_id is not None:
-                data["vectorId"] = vector_id
-            if storage_path is not None:
-                data["storagePath"] = storage_path
-            if size is not None:
-                data["size"] = size
-            if mime_type is not None:
-                data["mimeType"] = mime_type
+            # Only columns that were passed are updated
+            data = {
+                key: value
+                for key, value in (
+                    ("name", name),
+                    ("description", description),
+                    ("tags", tags),
+                    ("folderId", folder_id),
+                    ("indexed", indexed),
+                    ("hash", hash),
+                    ("status", status),
+                    ("vectorId", vector_id),
+                    ("storagePath", storage_path),
+                    ("size", size),
+                    ("mimeType", mime_type),
+                )
+                if value is not None
+            }
 
             if not data:
                 # No updates to make
                 return self.get_file_metadata(file_id)
 
-            result = self.tables_db.update_row(
-                database_id=Config.APPWRITE_DATABASE_ID,
-                table_id=Config.APPWRITE_TABLE_ID,
-                row_id=file_id,
-                data=data
-            )
+            result = self._request("PATCH", f"/{file_id}", json={"data": data})
 
+            self._invalidate(file_id)
             logger.info(f"Updated file metadata for {file_id}")
             # Tables API returns row object with _id, _createdAt, _updatedAt, _permissions, and data fields
-            if isinstance(result, dict):
-                # Extract data from row response
-                row_data = result.get("data", {})
-                # Merge with metadata fields from row response
-                if "_createdAt" in result:
-                    row_data["createdAt"] = result["_createdAt"]
-                if "_updatedAt" in result:
-                    row_data["updatedAt"] = result["_updatedAt"]
-                if "_id" in result:
-                    row_data["_id"] = result["_id"]
-                # Return the merged data
-                return row_data if row_data else result
-            return result
+            return _flatten_row(result) if isinstance(result, dict) else result
 
         except AppwriteException as e:
             logger.error(f"Failed to update file metadata: {e.message}")
@@ -351,15 +673,13 @@ class AppwriteClient:
             True if deleted successfully
         """
         try:
-            self.tables_db.delete_row(
-                database_id=Config.APPWRITE_DATABASE_ID,
-                table_id=Config.APPWRITE_TABLE_ID,
-                row_id=file_id
-            )
+            self._request("DELETE", f"/{file_id}")
+            self._invalidate(file_id)
             logger.info(f"Deleted file metadata for {file_id}")
             return True
         except AppwriteException as e:
             if e.code == 404:
+                self._invalidate(file_id)
                 return False
             logger.error(f"Failed to delete file metadata: {e.message}")
             raise
@@ -374,35 +694,54 @@ class AppwriteClient:
         Returns:
             File metadata record or None if not found
         """
-        try:
-            queries = [
-                Query.equal("hash", [hash_value]),
-                Query.limit(1)
-            ]
-            
-            result = self.tables_db.list_rows(
-                Config.APPWRITE_DATABASE_ID,
-                Config.APPWRITE_TABLE_ID,
-                queries
-            )
+        return self.find_files_by_hashes([hash_value]).get(hash_value)
 
-            rows = result.get("rows", [])
-            if not rows:
-                return None
-            
-            # Extract data from row response
-            row = rows[0]
-            row_data = row.get("data", {})
-            # Merge with metadata fields from row response
-            if "_createdAt" in row:
-                row_data["createdAt"] = row["_createdAt"]
-            if "_updatedAt" in row:
-                row_data["updatedAt"] = row["_updatedAt"]
-            if "_id" in row:
-                row_data["_id"] = row["_id"]
-            # Return the merged data
-            return row_data if row_data else row
-        except AppwriteException as e:
-            logger.error(f"Failed to find file by hash: {e.message}")
-            return None
+    def find_files_by_hashes(self, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Find files for several SHA-256 hashes with one query per 100 hashes.
+
+        Args:
+            hashes: SHA-256 hashes to search for
 
+        Returns:
+            Dictionary mapping each found hash to its file metadata record
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            # Appwrite accepts at most 100 values per equal query
+            for start in range(0, len(unique_hashes), 100):
+                chunk = unique_hashes[start:start + 100]
+                offset = 0
+                while True:
+                    queries = [
+                        _eq("hash", chunk),
+                        _limit(len(chunk)),
+                        _offset(offset)
+                    ]
+                    rows = self._request("GET", params={"queries[]": queries}).get("rows", [])
+                    self._collect_hash_rows(rows, found)
+
+                    # Deduplicated files share a hash, so one page may not
+                    # cover every hash; fetch more only while some are missing
+                    offset += len(rows)
+                    if len(rows) < len(chunk) or all(h in found for h in chunk):
+                        break
+            return found
+        except AppwriteException as e:
+            logger.error(f"Failed to find files by hash: {e.message}")
+            return found
+
+    @staticmethod
+    def _collect_hash_rows(rows: List[Dict[str, Any]], found: Dict[str, Dict[str, Any]]):
+        """Add the first row seen for each hash to found."""
+        for row in rows:
+            record = _flatten_row(row)
+            # Keep the first match per hash, as the single lookup did
+            found.setdefault(record.get("hash"), record)
+
+
+@lru_cache(maxsize=1)
+def get_appwrite_client() -> AppwriteClient:
+    """Get the process-wide Appwrite client (shares its read caches)."""
+    return AppwriteClient()
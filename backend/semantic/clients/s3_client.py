@@ -1,20 +1,40 @@
 """S3 client for presigned URL generation and file operations."""
 
 import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, BinaryIO, Tuple
 import boto3
+from boto3.s3.transfer import TransferConfig
+from cachetools import TTLCache
 from botocore.exceptions import ClientError
 from botocore.config import Config as BotoConfig
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Part counts from which presigning is spread over a thread pool
+_PARALLEL_PRESIGN_MIN_PARTS = 64
+_PRESIGN_WORKERS = 16
+
+# Cached download URLs are reissued once less than this many seconds of
+# their validity would remain for the caller
+_PRESIGNED_URL_SAFETY_MARGIN = 60
+
+# Batched existence checks: concurrent HEAD requests, or one listing of the
+# keys' common prefix bounded to this many pages before falling back to HEAD.
+_EXISTS_WORKERS = 32
+_EXISTS_MAX_LIST_PAGES = 4
+
+# Objects at or above this size are downloaded as concurrent ranged GETs
+MULTIPART_DOWNLOAD_THRESHOLD = 16 << 20
+
 
 class S3Client:
     """Client for S3-compatible storage operations."""
@@ -27,9 +47,31 @@ class S3Client:
             aws_access_key_id=Config.S3_ACCESS_KEY_ID,
             aws_secret_access_key=Config.S3_SECRET_ACCESS_KEY,
             region_name=Config.S3_REGION,
-            config=BotoConfig(signature_version="s3v4")
+            # Size the connection pool for the worker threads sharing this
+            # client and keep connections warm to skip repeated TLS handshakes
+            config=BotoConfig(
+                signature_version="s3v4",
+                max_pool_connections=max(50, Config.WORKER_THREADS),
+                retries={"mode": "adaptive", "max_attempts": 3},
+                tcp_keepalive=True,
+            ),
         )
         self.bucket_name = Config.S3_BUCKET_NAME
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_DOWNLOAD_THRESHOLD,
+            multipart_chunksize=8 << 20,
+            max_concurrency=16,
+            use_threads=True,
+        )
+        # Settings read on every call are bound once here
+        self.upload_expires_in = Config.PRESIGNED_UPLOAD_EXPIRES_IN
+        self.download_expires_in = Config.PRESIGNED_DOWNLOAD_EXPIRES_IN
+        self.url_cache_ttl = Config.PRESIGNED_URL_CACHE_TTL
+        # (key, expires_in) → (issued_at, url)
+        self._download_url_cache = TTLCache(
+            maxsize=5000, ttl=max(self.url_cache_ttl, 1)
+        )
+        self._download_url_cache_lock = threading.Lock()
 
     def generate_presigned_upload_url(
         self,
@@ -49,7 +91,7 @@ class S3Client:
             Presigned upload URL
         """
         if expires_in is None:
-            expires_in = Config.PRESIGNED_UPLOAD_EXPIRES_IN
+            expires_in = self.upload_expires_in
 
         try:
             url = self.s3_client.generate_presigned_url(
@@ -71,21 +113,37 @@ class S3Client:
         self,
         key: str,
         expires_in: int = None,
-    ) -> str:
+    ) -> Tuple[str, int]:
         """
         Generate a presigned URL for file download.
 
+        A recently signed URL for the same object and expiry may be returned
+        instead of a new one, so the remaining validity is returned with it.
+
         Args:
             key: S3 object key (storage path)
             expires_in: URL expiration time in seconds (default: 1 hour)
 
         Returns:
-            Presigned download URL
+            Tuple of (presigned download URL, seconds it remains valid)
         """
         if expires_in is None:
-            expires_in = Config.PRESIGNED_DOWNLOAD_EXPIRES_IN
+            expires_in = self.download_expires_in
+
+        # Reuse a recent signature for the same object while it stays valid
+        # for at least the safety margin; report how long it has left
+        cache_key = (key, expires_in)
+        max_age = min(self.url_cache_ttl, expires_in - _PRESIGNED_URL_SAFETY_MARGIN)
+        if max_age > 0:
+            with self._download_url_cache_lock:
+                entry = self._download_url_cache.get(cache_key)
+            if entry is not None:
+                age = time.monotonic() - entry[0]
+                if age < max_age:
+                    return entry[1], expires_in - math.ceil(age)
 
         try:
+            issued_at = time.monotonic()
             url = self.s3_client.generate_presigned_url(
                 "get_object",
                 Params={
@@ -94,8 +152,11 @@ class S3Client:
                 },
                 ExpiresIn=expires_in,
             )
+            if max_age > 0:
+                with self._download_url_cache_lock:
+                    self._download_url_cache[cache_key] = (issued_at, url)
             logger.info(f"Generated presigned download URL for {key}")
-            return url
+            return url, expires_in
         except ClientError as e:
             logger.error(f"Failed to generate presigned download URL: {e}")
             raise
@@ -120,7 +181,7 @@ class S3Client:
             Dictionary with uploadId and list of presigned URLs for each part
         """
         if expires_in is None:
-            expires_in = Config.PRESIGNED_UPLOAD_EXPIRES_IN
+            expires_in = self.upload_expires_in
 
         try:
             # Create multipart upload
@@ -131,9 +192,7 @@ class S3Client:
             )
             upload_id = response["UploadId"]
 
-            # Generate presigned URLs for each part
-            part_urls = []
-            for part_number in range(1, parts + 1):
+            def presign_part(part_number: int) -> Dict[str, Any]:
                 url = self.s3_client.generate_presigned_url(
                     "upload_part",
                     Params={
@@ -144,10 +203,19 @@ class S3Client:
                     },
                     ExpiresIn=expires_in,
                 )
-                part_urls.append({
+                return {
                     "partNumber": part_number,
                     "url": url,
-                })
+                }
+
+            # Generate presigned URLs for each part; large uploads (up to
+            # 10,000 parts) are signed on a thread pool, in part order
+            part_numbers = range(1, parts + 1)
+            if parts >= _PARALLEL_PRESIGN_MIN_PARTS:
+                with ThreadPoolExecutor(max_workers=_PRESIGN_WORKERS) as executor:
+                    part_urls = list(executor.map(presign_part, part_numbers))
+            else:
+                part_urls = [presign_part(part_number) for part_number in part_numbers]
 
             logger.info(f"Generated multipart upload URLs for {key} ({parts} parts)")
             return {
@@ -168,14 +236,32 @@ class S3Client:
         Returns:
             File content as bytes
         """
+        content = b"".join(self.iter_download(key))
+        logger.info(f"Downloaded file {key} ({len(content)} bytes)")
+        return content
+
+    def iter_download(self, key: str, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+        """
+        Stream a file from S3 in chunks.
+
+        Peak memory stays at one chunk for callers that process the content
+        incrementally (e.g. hashing) instead of holding the whole file.
+
+        Args:
+            key: S3 object key (storage path)
+            chunk_size: Bytes per chunk (default 1 MiB)
+
+        Yields:
+            Consecutive chunks of the file content
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+        """
         try:
             response = self.s3_client.get_object(
                 Bucket=self.bucket_name,
                 Key=key,
             )
-            content = response["Body"].read()
-            logger.info(f"Downloaded file {key} ({len(content)} bytes)")
-            return content
         except ClientError as e:
             if e.response["Error"]["Code"] == "NoSuchKey":
                 logger.error(f"File not found: {key}")
@@ -183,6 +269,40 @@ class S3Client:
             logger.error(f"Failed to download file: {e}")
             raise
 
+        body = response["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def download_to_file(self, key: str, fileobj: BinaryIO):
+        """
+        Download a file from S3 into a writable file object.
+
+        Objects above MULTIPART_DOWNLOAD_THRESHOLD are fetched as concurrent
+        ranged GETs, which keeps several connections busy on large files.
+
+        Args:
+            key: S3 object key (storage path)
+            fileobj: Seekable binary file object to write the content to
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+        """
+        try:
+            self.s3_client.download_fileobj(
+                Bucket=self.bucket_name,
+                Key=key,
+                Fileobj=fileobj,
+                Config=self.transfer_config,
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                logger.error(f"File not found: {key}")
+                raise FileNotFoundError(f"File not found: {key}")
+            logger.error(f"Failed to download file: {e}")
+            raise
+
     def delete_file(self, key: str) -> bool:
         """
         Delete a file from S3.
@@ -198,6 +318,9 @@ class S3Client:
                 Bucket=self.bucket_name,
                 Key=key,
             )
+            with self._download_url_cache_lock:
+                for cache_key in [k for k in self._download_url_cache if k[0] == key]:
+                    self._download_url_cache.pop(cache_key, None)
             logger.info(f"Deleted file {key}")
             return True
         except ClientError as e:
@@ -226,3 +349,74 @@ class S3Client:
             logger.error(f"Failed to check file existence: {e}")
             raise
 
+    def files_exist(self, keys: List[str]) -> Dict[str, bool]:
+        """
+        Check whether several files exist in S3.
+
+        Keys sharing a directory prefix are resolved from a listing of that
+        prefix; anything the listing does not settle is checked with
+        concurrent HEAD requests.
+
+        Args:
+            keys: S3 object keys (storage paths)
+
+        Returns:
+            Dictionary mapping each key to whether it exists
+        """
+        unique = list(dict.fromkeys(keys))
+        if not unique:
+            return {}
+        if len(unique) == 1:
+            return {unique[0]: self.file_exists(unique[0])}
+
+        result: Dict[str, bool] = {}
+        prefix = os.path.commonprefix(unique)
+        prefix = prefix[:prefix.rfind("/") + 1]
+        if prefix:
+            result = self._exists_from_listing(prefix, unique)
+
+        pending = [key for key in unique if key not in result]
+        if pending:
+            workers = min(_EXISTS_WORKERS, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                result.update(zip(pending, executor.map(self.file_exists, pending)))
+        return result
+
+    def _exists_from_listing(self, prefix: str, keys: List[str]) -> Dict[str, bool]:
+        """
+        Resolve key existence from a bounded listing of a shared prefix.
+
+        Args:
+            prefix: Common prefix of all keys
+            keys: S3 object keys under prefix
+
+        Returns:
+            Existence of every key when the listing covered them all,
+            otherwise only the keys seen so far
+        """
+        wanted = set(keys)
+        last_key = max(keys)
+        found = set()
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=prefix,
+            StartAfter=min(keys)[:-1],
+        )
+        try:
+            for page_number, page in enumerate(pages, 1):
+                contents = page.get("Contents", [])
+                found.update(item["Key"] for item in contents if item["Key"] in wanted)
+                if not page.get("IsTruncated") or (contents and contents[-1]["Key"] >= last_key):
+                    return {key: key in found for key in keys}
+                if page_number >= _EXISTS_MAX_LIST_PAGES:
+                    break
+        except ClientError as e:
+            logger.error(f"Failed to list files under {prefix}: {e}")
+        return dict.fromkeys(found, True)
+
+
+@lru_cache(maxsize=1)
+def get_s3_client() -> S3Client:
+    """Get the process-wide S3 client."""
+    return S3Client()
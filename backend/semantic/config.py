@@ -2,7 +2,8 @@
 
 import os
 import logging
-from typing import Optional
+from functools import lru_cache
+from typing import Final, List, Optional
 from pathlib import Path
 
 # Load .env file if it exists
@@ -19,6 +20,12 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _index_file(index_dir: str, name: str) -> str:
+    """Join a file name onto the index directory, memoized per directory."""
+    return os.path.join(index_dir, name)
+
+
 class Config:
     """Application configuration loaded from environment variables."""
 
@@ -50,7 +57,8 @@ class Config:
 
     # Service Configuration
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", "104857600"))  # 100MB default
-    ALLOWED_MIME_TYPES: list[str] = (
+    # frozenset for O(1) membership checks on every upload
+    ALLOWED_MIME_TYPES: frozenset[str] = frozenset(
         os.getenv(
             "ALLOWED_MIME_TYPES",
             "application/pdf,text/plain,image/jpeg,image/png,image/webp,"
@@ -61,15 +69,63 @@ class Config:
     # Index Configuration
     INDEX_DIR: str = os.getenv("INDEX_DIR", "./index")
     MODEL_NAME: str = "all-MiniLM-L6-v2"
+    MODEL_BACKEND: str = os.getenv("MODEL_BACKEND", "torch").lower()  # torch, onnx or openvino
+    MODEL_FILE_NAME: str = os.getenv("MODEL_FILE_NAME", "")  # e.g. model_qint8_avx512_vnni.onnx
+    MODEL_DEVICE: str = os.getenv("MODEL_DEVICE", "")  # cpu or cuda; auto-detected if empty
+    PRELOAD_MODEL: bool = os.getenv("PRELOAD_MODEL", "false").lower() == "true"  # else load on first encode
     EMBEDDING_DIM: int = 384  # Dimension for all-MiniLM-L6-v2
+    INDEX_TYPE: str = os.getenv("INDEX_TYPE", "flat").lower()  # "flat", "hnsw" or "auto"
+    HNSW_PROMOTE_AT: int = int(os.getenv("HNSW_PROMOTE_AT", "50000"))  # auto: switch to hnsw at this size
+    INDEX_ENCODING: str = os.getenv("INDEX_ENCODING", "fp16").lower()  # "fp32", "fp16" or "int8"
+    HNSW_M: int = int(os.getenv("HNSW_M", "32"))
+    HNSW_EF_CONSTRUCTION: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH: int = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    # Cosine similarity at which a new document shares an existing vector; 0 disables
+    NEAR_DUPLICATE_THRESHOLD: float = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0"))
+
+    # Index Persistence (write-ahead log + periodic snapshot)
+    SNAPSHOT_INTERVAL_SECONDS: float = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "30"))
+    SNAPSHOT_EVERY_OPS: int = int(os.getenv("SNAPSHOT_EVERY_OPS", "500"))
+    WAL_SYNC: bool = os.getenv("WAL_SYNC", "false").lower() == "true"  # O_DSYNC log writes
+
+    # Embedding Batching
+    ENCODE_BATCH_SIZE: int = int(os.getenv("ENCODE_BATCH_SIZE", "32"))
+    ENCODE_BATCH_WINDOW_MS: float = float(os.getenv("ENCODE_BATCH_WINDOW_MS", "10"))
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "4096"))  # 0 disables
+    # Content hash for deduplication: "sha256" or "blake3" (needs the blake3 package)
+    HASH_ALGORITHM: str = os.getenv("HASH_ALGORITHM", "sha256").lower()
+
+    # Extracted text and embeddings kept per content hash, in MiB (0 disables)
+    EXTRACTION_CACHE_MB: int = int(os.getenv("EXTRACTION_CACHE_MB", "64"))
+
+    # Worker threads for blocking calls made by request handlers; they mostly
+    # wait on Appwrite/S3, so default to the ThreadPoolExecutor sizing
+    WORKER_THREADS: int = int(os.getenv("WORKER_THREADS", str(min(32, (os.cpu_count() or 1) + 4))))
+
+    # Processes extracting text from large PDFs in parallel (1 disables)
+    PDF_WORKERS: int = max(1, int(os.getenv("PDF_WORKERS", str(min(8, os.cpu_count() or 1)))))
+
+    # Torch intra-op threads per process. With several uvicorn workers each
+    # would otherwise use every core; 0 means CPU count // UVICORN_WORKERS
+    UVICORN_WORKERS: int = int(os.getenv("UVICORN_WORKERS", "1"))
+    TORCH_NUM_THREADS: int = int(os.getenv("TORCH_NUM_THREADS", "0"))
+
+    # Appwrite Read Cache (seconds; 0 disables). Entries near expiry are
+    # served while being refreshed in the background
+    METADATA_CACHE_TTL: int = int(os.getenv("METADATA_CACHE_TTL", "60"))
+    METADATA_CACHE_SIZE: int = int(os.getenv("METADATA_CACHE_SIZE", "10000"))
+    LIST_CACHE_TTL: int = int(os.getenv("LIST_CACHE_TTL", "30"))
+    LIST_CACHE_SIZE: int = int(os.getenv("LIST_CACHE_SIZE", "1000"))
 
     # Presigned URL Expiration
     PRESIGNED_UPLOAD_EXPIRES_IN: int = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES_IN", "900"))  # 15 minutes
     PRESIGNED_DOWNLOAD_EXPIRES_IN: int = int(os.getenv("PRESIGNED_DOWNLOAD_EXPIRES_IN", "3600"))  # 1 hour
+    # How long a signed download URL is reused for the same object (0 disables)
+    PRESIGNED_URL_CACHE_TTL: int = int(os.getenv("PRESIGNED_URL_CACHE_TTL", "300"))  # 5 minutes
 
     @classmethod
-    def validate(cls) -> bool:
-        """Validate that all required configuration is present."""
+    def missing_required(cls) -> List[str]:
+        """Return the names of required settings that are not set."""
         required_vars = [
             ("APPWRITE_ENDPOINT", cls.APPWRITE_ENDPOINT),
             ("APPWRITE_PROJECT_ID", cls.APPWRITE_PROJECT_ID),
@@ -81,21 +137,45 @@ class Config:
             ("S3_SECRET_ACCESS_KEY", cls.S3_SECRET_ACCESS_KEY),
             ("S3_BUCKET_NAME", cls.S3_BUCKET_NAME),
         ]
+        return [var for var, value in required_vars if not value]
 
-        missing = [var for var, value in required_vars if not value]
-        if missing:
-            logger.error(f"Missing required environment variables: {', '.join(missing)}")
-            return False
-
-        return True
+    @classmethod
+    def validate(cls) -> bool:
+        """Validate that all required configuration is present."""
+        if _MISSING:
+            logger.error(f"Missing required environment variables: {', '.join(_MISSING)}")
+        return CONFIG_VALID
 
     @classmethod
     def get_index_path(cls) -> str:
         """Get the full path to the FAISS index file."""
-        return os.path.join(cls.INDEX_DIR, "faiss.index")
+        return _index_file(cls.INDEX_DIR, "faiss.index")
 
     @classmethod
     def get_meta_path(cls) -> str:
-        """Get the full path to the metadata pickle file."""
-        return os.path.join(cls.INDEX_DIR, "meta.pkl")
+        """Get the full path to the id map record file."""
+        return _index_file(cls.INDEX_DIR, "ids.bin")
+
+    @classmethod
+    def get_npy_meta_path(cls) -> str:
+        """Get the full path to the earlier numpy id map file."""
+        return _index_file(cls.INDEX_DIR, "ids.npy")
+
+    @classmethod
+    def get_legacy_meta_path(cls) -> str:
+        """Get the full path to the legacy metadata pickle file."""
+        return _index_file(cls.INDEX_DIR, "meta.pkl")
+
+    @classmethod
+    def get_wal_path(cls) -> str:
+        """Get the full path to the index write-ahead log."""
+        return _index_file(cls.INDEX_DIR, "wal.bin")
+
+
+# Configuration is read once from the environment, so validate it once too
+_MISSING: Final[List[str]] = Config.missing_required()
+CONFIG_VALID: Final[bool] = not _MISSING
 
+# Opt in to failing at import instead of at service startup
+if _MISSING and os.getenv("STRICT_CONFIG", "false").lower() == "true":
+    raise RuntimeError(f"Missing required environment variables: {', '.join(_MISSING)}")
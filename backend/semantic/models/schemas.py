@@ -1,11 +1,22 @@
 """Pydantic models for request/response validation."""
 
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+
+class FrozenModel(BaseModel):
+    """Base for response models: immutable, extra fields from Appwrite rows are ignored."""
+    # model_loaded is a field name, not pydantic's model_ namespace
+    model_config = ConfigDict(frozen=True, protected_namespaces=())
+
+
+class RequestModel(BaseModel):
+    """Base for request models: immutable, unknown fields are rejected."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
 
 
 # Upload Models
-class PresignUploadRequest(BaseModel):
+class PresignUploadRequest(RequestModel):
     """Request model for presigned upload URL generation."""
     name: str = Field(..., description="Original file name")
     size: int = Field(..., gt=0, description="File size in bytes")
@@ -17,19 +28,19 @@ class PresignUploadRequest(BaseModel):
     parts: Optional[int] = Field(None, gt=0, description="Number of parts for multipart upload")
 
 
-class PresignUploadResponse(BaseModel):
+class PresignUploadResponse(FrozenModel):
     """Response model for presigned upload URL."""
     fileId: str
     upload: dict  # Contains mode, url, uploadId (if multipart), parts (if multipart)
     expiresIn: Optional[int] = None
 
 
-class CompleteUploadRequest(BaseModel):
+class CompleteUploadRequest(RequestModel):
     """Request model for completing upload and indexing."""
     fileId: str = Field(..., description="File ID from presign response")
 
 
-class CompleteUploadResponse(BaseModel):
+class CompleteUploadResponse(FrozenModel):
     """Response model for upload completion."""
     status: str
     fileId: str
@@ -39,7 +50,7 @@ class CompleteUploadResponse(BaseModel):
 
 
 # File Management Models
-class FileMetadata(BaseModel):
+class FileMetadata(FrozenModel):
     """File metadata model."""
     fileId: str
     name: str
@@ -56,15 +67,16 @@ class FileMetadata(BaseModel):
     status: str = "pending"
 
 
-class ListFilesResponse(BaseModel):
+class ListFilesResponse(FrozenModel):
     """Response model for file listing."""
-    files: List[FileMetadata]
+    files: List[FileMetadata] = Field(default_factory=list)
     total: int
     limit: int
     offset: int
+    nextCursor: Optional[str] = None
 
 
-class UpdateFileRequest(BaseModel):
+class UpdateFileRequest(RequestModel):
     """Request model for updating file metadata."""
     name: Optional[str] = Field(None, max_length=255)
     description: Optional[str] = Field(None, max_length=1000)
@@ -72,19 +84,19 @@ class UpdateFileRequest(BaseModel):
     folderId: Optional[str] = None
 
 
-class UpdateFileResponse(BaseModel):
+class UpdateFileResponse(FrozenModel):
     """Response model for file update."""
     status: str
     file: FileMetadata
 
 
-class DeleteFileResponse(BaseModel):
+class DeleteFileResponse(FrozenModel):
     """Response model for file deletion."""
     status: str
     fileId: str
 
 
-class DownloadUrlResponse(BaseModel):
+class DownloadUrlResponse(FrozenModel):
     """Response model for download URL generation."""
     url: str
     expiresIn: int
@@ -92,14 +104,17 @@ class DownloadUrlResponse(BaseModel):
 
 
 # Search Models
-class SearchRequest(BaseModel):
+class SearchRequest(RequestModel):
     """Request model for semantic search."""
     query: str = Field(..., min_length=1, max_length=500, description="Search query")
     k: int = Field(5, gt=0, le=100, description="Number of results to return")
     folderId: Optional[str] = Field(None, description="Optional folder ID filter")
+    threshold: Optional[float] = Field(
+        None, ge=-1.0, le=1.0, description="Optional minimum similarity score (e.g. 0.4)"
+    )
 
 
-class SearchResult(BaseModel):
+class SearchResult(FrozenModel):
     """Individual search result model."""
     fileId: str
     name: str
@@ -110,15 +125,62 @@ class SearchResult(BaseModel):
     description: Optional[str] = None
 
 
-class SearchResponse(BaseModel):
+class SearchResponse(FrozenModel):
     """Response model for search."""
     results: List[SearchResult]
     query: str
     total: int
 
 
+# Validates and serializes a whole search response in one pydantic-core pass
+SearchResponseAdapter = TypeAdapter(SearchResponse)
+
+
+# Direct Index Models
+class IndexRequest(RequestModel):
+    """Request model for indexing raw text under a file ID."""
+    file_id: str = Field(..., description="File ID to index the text under")
+    text: str = Field(..., description="Text content to index")
+
+
+class IndexResponse(FrozenModel):
+    """Response model for direct indexing."""
+    file_id: str
+    vector_id: Optional[int] = None
+    status: str
+
+
+class IndexBulkRequest(RequestModel):
+    """Request model for indexing several texts in one call."""
+    docs: List[IndexRequest] = Field(
+        ..., min_length=1, max_length=128, description="Documents to index"
+    )
+
+
+class IndexBulkResponse(FrozenModel):
+    """Response model for bulk indexing, one entry per document in request order."""
+    results: List[IndexResponse]
+
+
+class IndexSearchRequest(RequestModel):
+    """Request model for searching the index directly."""
+    query: str = Field(..., description="Search query")
+    k: int = Field(5, description="Number of results to return")
+    threshold: Optional[float] = Field(
+        None, ge=-1.0, le=1.0, description="Optional minimum similarity score"
+    )
+
+
+class IndexSearchResponse(FrozenModel):
+    """Response model for direct index search."""
+    results: List[str]
+    scores: List[float] = Field(default_factory=list)  # Cosine similarity per result
+    query: str
+    total: int
+
+
 # System Models
-class HealthResponse(BaseModel):
+class HealthResponse(FrozenModel):
     """Response model for health check."""
     status: str
     model_loaded: bool
@@ -127,7 +189,7 @@ class HealthResponse(BaseModel):
     documents_indexed: int
 
 
-class StatsResponse(BaseModel):
+class StatsResponse(FrozenModel):
     """Response model for service statistics."""
     model: str
     embedding_dimension: int
@@ -135,9 +197,10 @@ class StatsResponse(BaseModel):
     documents_indexed: int
     index_path: str
     meta_path: str
+    query_cache: Optional[dict] = None  # hits, misses, size, maxsize
 
 
-class APIInfoResponse(BaseModel):
+class APIInfoResponse(FrozenModel):
     """Response model for API information."""
     service: str
     status: str
@@ -0,0 +1,138 @@
+"""Micro-batching of embedding requests for the semantic indexer."""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EncodeBatcher:
+    """
+    Coalesce concurrent encode calls into batched model invocations.
+
+    Callers block on ``encode`` while a single worker thread drains the queue,
+    waiting up to ``window`` seconds for more texts before running one batched
+    forward pass. This amortizes the fixed per-call cost of the transformer
+    (tokenization, kernel dispatch) across concurrent requests.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        window: float = 0.01,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            encode_fn: Function encoding a list of texts into a (n, d) array
+            max_batch_size: Maximum number of texts per model call
+            window: Seconds to wait for more texts once a batch is started
+        """
+        self._encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window)
+        self._queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the background worker thread if it is not running."""
+        with self._start_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="encode-batcher", daemon=True
+            )
+            self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop the worker thread after it drains queued requests.
+
+        Args:
+            timeout: Optional seconds to wait for the worker to exit
+        """
+        with self._start_lock:
+            worker = self._worker
+            self._worker = None
+        if worker is None:
+            return
+        self._queue.put(None)
+        worker.join(timeout)
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Encode a single text, batched with any concurrent callers.
+
+        Args:
+            text: Text to encode
+
+        Returns:
+            Embedding as a (1, d) float32 array
+        """
+        return self.submit(text).result()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for encoding without waiting for the result.
+
+        Args:
+            text: Text to encode
+
+        Returns:
+            Future resolving to a (1, d) float32 array
+        """
+        if self._worker is None:
+            self.start()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _run(self):
+        """Worker loop: collect a batch, encode it, resolve the futures."""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+    def _process(self, batch: List[Tuple[str, Future]]):
+        """Run one model call for a batch and distribute the rows."""
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = self._encode_fn(texts)
+        except Exception as e:
+            logger.error(f"Batched encode failed for {len(texts)} texts: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        logger.debug(f"Encoded batch of {len(texts)} texts")
+        for row, (_, future) in enumerate(batch):
+            future.set_result(embeddings[row:row + 1])
@@ -0,0 +1,80 @@
+"""Content-hash keyed cache of extracted text and document embeddings."""
+
+import logging
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Cached value: extracted text (None if extraction found nothing) and the
+# document embedding (None if the text was not embedded)
+CachedExtraction = Tuple[Optional[str], Optional[np.ndarray]]
+
+
+def _entry_size(value: CachedExtraction) -> int:
+    """Approximate the memory held by a cache entry in bytes."""
+    text, embedding = value
+    size = len(text) if text else 0
+    if embedding is not None:
+        size += embedding.nbytes
+    return max(size, 1)
+
+
+class ExtractionCache:
+    """
+    LRU cache of extraction results keyed by file content hash.
+
+    Re-uploads and retried completions of identical content skip text
+    extraction and embedding. The cache is bounded by the approximate bytes
+    of text and embeddings it holds rather than by entry count, since
+    extracted documents vary from a few bytes to megabytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Approximate memory budget; 0 disables caching
+        """
+        self.enabled = max_bytes > 0
+        self._cache: LRUCache = LRUCache(maxsize=max(max_bytes, 1), getsizeof=_entry_size)
+        self._lock = threading.Lock()
+
+    def get(self, file_hash: str) -> Optional[CachedExtraction]:
+        """
+        Look up the extraction result for a content hash.
+
+        Args:
+            file_hash: Hex digest of the file content
+
+        Returns:
+            (text, embedding) if cached, None otherwise
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._cache.get(file_hash)
+
+    def put(self, file_hash: str, text: Optional[str], embedding: Optional[np.ndarray]):
+        """
+        Store the extraction result for a content hash.
+
+        Entries larger than the whole budget are not cached.
+
+        Args:
+            file_hash: Hex digest of the file content
+            text: Extracted text, or None if extraction found nothing
+            embedding: Document embedding, or None if not embedded
+        """
+        if not self.enabled:
+            return
+        value = (text, embedding)
+        if _entry_size(value) > self._cache.maxsize:
+            logger.debug(f"Extraction for {file_hash} exceeds the cache budget, not caching")
+            return
+        with self._lock:
+            self._cache[file_hash] = value
@@ -1,19 +1,21 @@
 """File service for orchestrating file operations."""
 
 import logging
-import hashlib
+import os
+import secrets
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
 from typing import Optional, Dict, Any, List
 from fastapi import HTTPException, status
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from clients.appwrite_client import AppwriteClient
-from clients.s3_client import S3Client
+from clients.appwrite_client import get_appwrite_client
+from clients.s3_client import get_s3_client, MULTIPART_DOWNLOAD_THRESHOLD
 from services.text_extractor import TextExtractor
-from services.semantic_indexer import SemanticIndexer
+from services.extraction_cache import ExtractionCache
+from services.semantic_indexer import get_semantic_indexer
 from utils.validators import (
     validate_file_name,
     validate_file_size,
@@ -21,20 +23,48 @@ from utils.validators import (
     validate_file_id,
     sanitize_path
 )
+from utils.fast_hash import content_hash_stream
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Uploads are streamed from S3 in chunks of this size; content kept for text
+# extraction stays in memory up to the spool limit, then moves to disk
+_DOWNLOAD_CHUNK_SIZE = 8 << 20
+_SPOOL_MAX_SIZE = 32 << 20
+
+# Characters allowed as the first one of an Appwrite row ID
+_ALNUM = string.ascii_letters + string.digits
+
+# Text extraction runs here, off the request's worker thread, so it can
+# overlap Appwrite round trips. Large PDFs fan out further to processes. PDFium
+# is not thread-safe: TextExtractor serializes its in-process PDFium calls, so
+# concurrent PDFs on these threads queue for that lock while other types proceed.
+_extract_pool: Optional[ThreadPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+
+def _get_extract_pool() -> ThreadPoolExecutor:
+    """Get the shared text extraction thread pool."""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="text-extract"
+            )
+        return _extract_pool
+
 
 class FileService:
     """Service for managing file operations."""
 
     def __init__(self):
         """Initialize file service with dependencies."""
-        self.appwrite_client = AppwriteClient()
-        self.s3_client = S3Client()
+        self.appwrite_client = get_appwrite_client()
+        self.s3_client = get_s3_client()
         self.text_extractor = TextExtractor()
-        self.semantic_indexer = SemanticIndexer()
+        self.semantic_indexer = get_semantic_indexer()
+        self.extraction_cache = ExtractionCache(Config.EXTRACTION_CACHE_MB << 20)
 
     def generate_storage_path(
         self,
@@ -102,16 +132,10 @@ class FileService:
         # Generate file ID (max 36 chars for Appwrite documentId)
         # Using 24 bytes = 32 chars base64, which fits within Appwrite's 36 char limit
         # Ensure it starts with alphanumeric (Appwrite requirement)
-        import secrets
-        import string
-        
-        # Generate random ID and ensure it starts with alphanumeric
         file_id = secrets.token_urlsafe(24)
-        # If it starts with a special char, prepend a random alphanumeric
-        if file_id[0] not in (string.ascii_letters + string.digits):
-            file_id = secrets.choice(string.ascii_letters + string.digits) + file_id
-            # Truncate to 36 chars if needed
-            file_id = file_id[:36]
+        # token_urlsafe output is ASCII, so isalnum only rejects "-" and "_"
+        if not file_id[0].isalnum():
+            file_id = secrets.choice(_ALNUM) + file_id[1:]
 
         # Generate storage path
         storage_path = self.generate_storage_path(
@@ -216,47 +240,99 @@ class FileService:
         storage_path = metadata.get("storagePath")
         mime_type = metadata.get("mimeType")
 
-        # Download file from S3
+        # Small files are streamed from S3 and hashed as chunks arrive; large
+        # ones are downloaded with concurrent ranged GETs and hashed from the
+        # spool. Content is kept only when text extraction needs it.
+        extractable = self.text_extractor.is_supported(mime_type)
+        ranged = (metadata.get("size") or 0) >= MULTIPART_DOWNLOAD_THRESHOLD
+        spool = (
+            SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+            if extractable or ranged
+            else None
+        )
         try:
-            file_content = self.s3_client.download_file(storage_path)
+            if ranged:
+                self.s3_client.download_to_file(storage_path, spool)
+                spool.seek(0)
+                file_hash = content_hash_stream(iter(lambda: spool.read(_DOWNLOAD_CHUNK_SIZE), b""))
+            else:
+                file_hash = content_hash_stream(
+                    self.s3_client.iter_download(storage_path, _DOWNLOAD_CHUNK_SIZE),
+                    sink=spool.write if spool is not None else None,
+                )
         except FileNotFoundError:
+            if spool is not None:
+                spool.close()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="File not found in storage"
             )
         except Exception as e:
+            if spool is not None:
+                spool.close()
             logger.error(f"Failed to download file: {e}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to download file from storage"
             )
 
-        # Compute SHA-256 hash
-        file_hash = hashlib.sha256(file_content).hexdigest()
+        if spool is not None and not extractable:
+            spool.close()
+            spool = None
+
+        # Extract text, reusing the result for content seen before. Extraction
+        # runs on its own pool so it overlaps the duplicate lookup below.
+        extracted_text = None
+        embedding = None
+        extraction = None
+        cache_key = f"{mime_type}:{file_hash}"
+        cached = self.extraction_cache.get(cache_key) if spool is not None else None
+        if cached is not None:
+            logger.info(f"Reusing cached extraction for hash {file_hash}")
+            spool.close()
+            extracted_text, embedding = cached
+        elif spool is not None:
+            extraction = _get_extract_pool().submit(self._extract_spooled, spool, mime_type)
 
         # Check for deduplication
+        indexed = False
+        vector_id = None
         existing_file = self.appwrite_client.find_file_by_hash(file_hash)
         if existing_file and existing_file.get("fileId") != validated_file_id:
             logger.info(f"File with hash {file_hash} already exists, reusing storage")
             # Update metadata to point to existing file
             storage_path = existing_file.get("storagePath")
+            # Identical content already indexed: share its vector and skip
+            # extraction and embedding
+            if existing_file.get("indexed"):
+                vector_id = self.semantic_indexer.alias(
+                    validated_file_id, existing_file.get("fileId")
+                )
+                indexed = vector_id is not None
 
-        # Extract text
-        text_extracted = False
-        extracted_text = None
-        if self.text_extractor.is_supported(mime_type):
-            extracted_text = self.text_extractor.extract_text(file_content, mime_type)
+        aliased = indexed
+        if aliased:
+            text_extracted = True
+            if extraction is not None and extraction.cancel():
+                spool.close()
+        else:
+            if extraction is not None:
+                extracted_text = extraction.result()
             text_extracted = extracted_text is not None
 
         # Index semantically
-        indexed = False
-        vector_id = None
-        if extracted_text:
+        if extracted_text and not aliased:
             try:
-                vector_id = self.semantic_indexer.index_document(validated_file_id, extracted_text)
+                if embedding is None:
+                    embedding = self.semantic_indexer.embed_document(extracted_text)
+                vector_id = self.semantic_indexer.index_document(
+                    validated_file_id, extracted_text, embedding=embedding
+                )
                 indexed = vector_id is not None
             except Exception as e:
                 logger.error(f"Failed to index document: {e}")
+        if extraction is not None and not aliased:
+            self.extraction_cache.put(cache_key, extracted_text, embedding)
 
         # Update metadata with all fields
         try:
@@ -279,6 +355,21 @@ class FileService:
             "vectorId": str(vector_id) if vector_id is not None else None,
         }
 
+    def _extract_spooled(self, spool: SpooledTemporaryFile, mime_type: str) -> Optional[str]:
+        """
+        Extract text from a spooled download and release the spool.
+
+        Args:
+            spool: Spooled file content
+            mime_type: MIME type of the file
+
+        Returns:
+            Extracted text or None if extraction fails
+        """
+        with spool:
+            spool.seek(0)
+            return self.text_extractor.extract_text_stream(spool, mime_type)
+
     def list_files(
         self,
         user_id: str,
@@ -308,6 +399,35 @@ class FileService:
             mime_type=mime_type,
         )
 
+    def list_files_after(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        folder_id: Optional[str] = None,
+        mime_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        List user's files with cursor pagination, newest first.
+
+        Args:
+            user_id: User ID
+            cursor: nextCursor from the previous page (None for the first page)
+            limit: Maximum number of results
+            folder_id: Optional folder filter
+            mime_type: Optional MIME type filter
+
+        Returns:
+            Dictionary with files list, pagination info and nextCursor
+        """
+        return self.appwrite_client.list_files_after(
+            user_id=user_id,
+            cursor_id=validate_file_id(cursor) if cursor else None,
+            limit=limit,
+            folder_id=folder_id,
+            mime_type=mime_type,
+        )
+
     def get_file(self, user_id: str, file_id: str) -> Dict[str, Any]:
         """
         Get file metadata.
@@ -438,14 +558,14 @@ class FileService:
         if expires_in:
             expires_in = min(expires_in, 86400)  # Max 24 hours
 
-        url = self.s3_client.generate_presigned_download_url(
+        url, remaining = self.s3_client.generate_presigned_download_url(
             key=storage_path,
             expires_in=expires_in,
         )
 
         return {
             "url": url,
-            "expiresIn": expires_in or Config.PRESIGNED_DOWNLOAD_EXPIRES_IN,
+            "expiresIn": remaining,
             "fileId": file_id,
         }
 
@@ -455,6 +575,7 @@ class FileService:
         query: str,
         k: int = 5,
         folder_id: Optional[str] = None,
+        threshold: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Perform semantic search across user's files.
@@ -464,24 +585,28 @@ class FileService:
             query: Search query
             k: Number of results
             folder_id: Optional folder filter
+            threshold: Optional minimum similarity score
 
         Returns:
             Search results with file metadata
         """
         # Perform semantic search
-        file_ids = self.semantic_indexer.search(query, k)
+        matches = self.semantic_indexer.search(query, k, threshold=threshold)
 
-        if not file_ids:
+        if not matches:
             return {
                 "results": [],
                 "query": query,
                 "total": 0,
             }
 
-        # Get metadata for all results
+        # Get metadata for all results in one bulk read
+        metadata_by_id = self.appwrite_client.get_many_file_metadata(
+            [file_id for file_id, _ in matches]
+        )
         results = []
-        for file_id in file_ids:
-            metadata = self.appwrite_client.get_file_metadata(file_id)
+        for file_id, score in matches:
+            metadata = metadata_by_id.get(file_id)
             if not metadata:
                 continue
 
@@ -492,11 +617,10 @@ class FileService:
             if folder_id and metadata.get("folderId") != folder_id:
                 continue
 
-            # Calculate score (simplified - in production, get from FAISS)
             results.append({
                 "fileId": metadata.get("fileId"),
                 "name": metadata.get("name"),
-                "score": 0.95,  # Placeholder - should get from FAISS search
+                "score": score,  # Cosine similarity from FAISS
                 "size": metadata.get("size"),
                 "mimeType": metadata.get("mimeType"),
                 "createdAt": metadata.get("createdAt"),
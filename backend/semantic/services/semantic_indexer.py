@@ -1,46 +1,136 @@
 """Semantic indexing service using FAISS and Sentence Transformers."""
 
+import atexit
+import hashlib
 import logging
 import os
 import pickle
-from threading import Lock
-from typing import List, Optional, Tuple
+import struct
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
+from threading import Event, Lock, Thread
+from typing import Container, Dict, List, Optional, Tuple
 import faiss
 import numpy as np
+from readerwriterlock import rwlock
 from sentence_transformers import SentenceTransformer
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
 
 from config import Config
+from services.encode_batcher import EncodeBatcher
+from utils import kernels
 
 logger = logging.getLogger(__name__)
 
+# WAL record header: op (b"+" add / b"=" alias / b"-" remove), vector ID,
+# file_id byte length. Records are followed by the file_id; add records also
+# carry the float32 embedding.
+_WAL_HEADER = struct.Struct("<cqH")
+_WAL_ADD = b"+"
+_WAL_ALIAS = b"="
+_WAL_REMOVE = b"-"
+
+# id map snapshot: record count, then per record the file_id byte length,
+# the UTF-8 file_id and the vector ID
+_IDS_COUNT = struct.Struct("<I")
+_IDS_LENGTH = struct.Struct("<H")
+_IDS_VECTOR = struct.Struct("<q")
+
+# Vector IDs are a 63-bit blake2b hash of the file_id (FAISS IDs are signed)
+_VECTOR_ID_MASK = (1 << 63) - 1
+
+# Scalar quantizer per INDEX_ENCODING; fp32 stores raw floats
+_SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+# Documents longer than the model's sequence limit are embedded as windows of
+# this many tokens overlapping by _CHUNK_OVERLAP, then mean-pooled. Windows
+# past _MAX_CHUNKS are dropped to bound the cost of very long documents.
+_CHUNK_TOKENS = 256
+_CHUNK_OVERLAP = 64
+_MAX_CHUNKS = 128
+
 
 class SemanticIndexer:
     """Service for semantic indexing and search using FAISS."""
 
     def __init__(self):
         """Initialize the semantic indexer with model and FAISS index."""
-        self.model: Optional[SentenceTransformer] = None
+        # Loaded on first use (or at startup with PRELOAD_MODEL=true)
+        self._model: Optional[SentenceTransformer] = None
+        self._model_lock = Lock()
         self.index: Optional[faiss.Index] = None
         self.id_map: dict = {}  # file_id → FAISS vector ID mapping
         self.reverse_id_map: dict = {}  # FAISS vector ID → file_id mapping
-        self.next_vector_id: int = 0  # Next available vector ID
-        self.index_lock = Lock()
+        # FAISS vector ID → further file_ids deduplicated onto that vector
+        self.duplicate_ids: Dict[int, List[str]] = {}
+        # Vector IDs still stored in an HNSW index after their documents were
+        # removed; new IDs must not reuse them
+        self._tombstones: set = set()
+        # Searches share the read lock; index mutations take the write lock
+        self.index_lock = rwlock.RWLockFair()
+        # Query embedding LRU: blake2b(normalized query) → (1, d) embedding
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = Lock()
+        self._query_cache_hits = 0
+        self._query_cache_misses = 0
+        self.encoder = EncodeBatcher(
+            self._encode_batch,
+            max_batch_size=Config.ENCODE_BATCH_SIZE,
+            window=Config.ENCODE_BATCH_WINDOW_MS / 1000.0,
+        )
+        # Write-ahead log; snapshots are taken by a background thread
+        self._wal = None
+        self._ops_since_snapshot = 0
+        self._snapshot_requested = Event()
+        self._stop_snapshots = Event()
+        self._snapshot_thread: Optional[Thread] = None
+        self._snapshot_lock = Lock()
         self._initialize()
+        self.encoder.start()
+        self._start_snapshot_thread()
+        # Flush logged changes into a snapshot even if shutdown hooks never run
+        atexit.register(self.close)
+
+    @property
+    def model(self) -> SentenceTransformer:
+        """The embedding model, loaded and warmed up on first access."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    model = self._load_model()
+                    # Inference only: disable dropout once instead of per call
+                    model.eval()
+                    self._model = model
+                    self._warm_up()
+        return self._model
+
+    @property
+    def model_loaded(self) -> bool:
+        """Whether the embedding model has been loaded."""
+        return self._model is not None
 
     def _initialize(self):
-        """Initialize model and load or create FAISS index."""
-        logger.info(f"Loading model: {Config.MODEL_NAME}")
-        self.model = SentenceTransformer(Config.MODEL_NAME)
+        """Load or create the FAISS index, preloading the model if configured."""
+        if Config.PRELOAD_MODEL:
+            # Pay the model load at startup instead of on the first request
+            _ = self.model
 
         # Create index directory if it doesn't exist
         os.makedirs(Config.INDEX_DIR, exist_ok=True)
 
         index_path = Config.get_index_path()
         meta_path = Config.get_meta_path()
+        legacy_meta_path = Config.get_legacy_meta_path()
+        needs_snapshot = False
 
         # Load or create FAISS index
         if os.path.exists(index_path):
@@ -49,100 +139,704 @@ class SemanticIndexer:
 
             # Load id_map metadata
             if os.path.exists(meta_path):
-                with open(meta_path, "rb") as f:
-                    metadata = pickle.load(f)
-                    # Handle both old format (list) and new format (dict)
-                    if isinstance(metadata, list):
-                        # Migrate from old format
-                        logger.info("Migrating from old id_map format to new format")
-                        self.id_map = {file_id: idx for idx, file_id in enumerate(metadata)}
-                        self.reverse_id_map = {idx: file_id for idx, file_id in enumerate(metadata)}
-                        self.next_vector_id = len(metadata)
-                    else:
-                        # New format
-                        self.id_map = metadata.get("id_map", {})
-                        self.reverse_id_map = metadata.get("reverse_id_map", {})
-                        self.next_vector_id = metadata.get("next_vector_id", len(self.id_map))
-                logger.info(f"Loaded {len(self.id_map)} indexed documents")
+                self._load_id_map(meta_path)
+            elif os.path.exists(Config.get_npy_meta_path()):
+                self._load_npy_id_map(Config.get_npy_meta_path())
+                needs_snapshot = True
+            elif os.path.exists(legacy_meta_path):
+                self._load_legacy_id_map(legacy_meta_path)
+                needs_snapshot = True
             else:
                 logger.warning("Index exists but id_map not found. Starting fresh.")
                 self.id_map = {}
                 self.reverse_id_map = {}
-                self.next_vector_id = 0
+            logger.info(f"Loaded {len(self.id_map)} indexed documents")
         else:
-            logger.info("Creating new FAISS index with IndexIDMap for efficient deletion")
-            # Create FAISS index with L2 distance wrapped in IndexIDMap for deletion support
-            base_index = faiss.IndexFlatL2(Config.EMBEDDING_DIM)
-            self.index = faiss.IndexIDMap(base_index)
+            logger.info(f"Creating new FAISS index (INDEX_TYPE={Config.INDEX_TYPE})")
+            self.index = self._create_index()
             self.id_map = {}
             self.reverse_id_map = {}
-            self.next_vector_id = 0
-            logger.info("New index created successfully with IndexIDMap")
+            logger.info(f"New index created successfully: {self._describe_index()}")
+
+        # Apply changes logged since the last snapshot
+        if self._replay_wal() > 0:
+            needs_snapshot = True
+
+        if not self._index_matches_config(self.index):
+            logger.info(
+                f"Existing index does not match INDEX_TYPE={Config.INDEX_TYPE}, "
+                f"INDEX_ENCODING={Config.INDEX_ENCODING} with inner product metric, rebuilding"
+            )
+            self.index = self._rebuild_index(self.index)
+            needs_snapshot = True
+
+        self._collect_tombstones()
+
+        if needs_snapshot:
+            self._save_index()
+            self._truncate_wal_file()
+        self._wal = self._open_wal()
+
+    def _load_id_map(self, meta_path: str):
+        """
+        Load the id map from the length-prefixed record file.
+
+        The file is read in one sequential pass and parsed with precompiled
+        structs, with no pickle opcode interpretation.
+
+        Args:
+            meta_path: Path to ids.bin
+        """
+        with open(meta_path, "rb") as f:
+            data = f.read()
+
+        self.id_map = {}
+        self.reverse_id_map = {}
+        self.duplicate_ids = {}
+        (count,) = _IDS_COUNT.unpack_from(data, 0)
+        offset = _IDS_COUNT.size
+        for _ in range(count):
+            (id_len,) = _IDS_LENGTH.unpack_from(data, offset)
+            offset += _IDS_LENGTH.size
+            file_id = data[offset:offset + id_len].decode("utf-8")
+            offset += id_len
+            (vector_id,) = _IDS_VECTOR.unpack_from(data, offset)
+            offset += _IDS_VECTOR.size
+            self._link(file_id, vector_id)
+
+    def _load_npy_id_map(self, npy_meta_path: str):
+        """
+        Load the id map from the earlier numpy record file (migrated on next snapshot).
+
+        Args:
+            npy_meta_path: Path to ids.npy
+        """
+        records = np.load(npy_meta_path, mmap_mode="r")
+        self.id_map = {}
+        self.reverse_id_map = {}
+        self.duplicate_ids = {}
+        for file_id, vector_id in zip(records["file_id"].tolist(), records["vector_id"].tolist()):
+            self._link(file_id.decode("utf-8"), vector_id)
+
+    def _collect_tombstones(self):
+        """Record vector IDs stored in the index that no document maps to."""
+        stored_ids = faiss.vector_to_array(self.index.id_map).tolist()
+        self._tombstones = {vid for vid in stored_ids if vid not in self.reverse_id_map}
+
+    def _vector_id_for(self, file_id: str, taken: Container[int] = ()) -> int:
+        """
+        Derive the vector ID for a new document from its file_id.
+
+        IDs are a hash of the file_id, so no counter has to be persisted or
+        recovered. On the rare collision with an ID in use, the next free
+        value is taken.
+
+        Args:
+            file_id: File ID being indexed
+            taken: IDs already assigned in the current batch
+
+        Returns:
+            Unused non-negative vector ID
+        """
+        digest = hashlib.blake2b(file_id.encode("utf-8"), digest_size=8).digest()
+        vector_id = int.from_bytes(digest, "big") & _VECTOR_ID_MASK
+        while (
+            vector_id in self.reverse_id_map
+            or vector_id in self._tombstones
+            or vector_id in taken
+        ):
+            vector_id = (vector_id + 1) & _VECTOR_ID_MASK
+        return vector_id
+
+    def _load_legacy_id_map(self, legacy_meta_path: str):
+        """
+        Load the id map from the legacy pickle file (migrated on next snapshot).
+
+        Args:
+            legacy_meta_path: Path to meta.pkl
+        """
+        with open(legacy_meta_path, "rb") as f:
+            metadata = pickle.load(f)
+            # Handle both old format (list) and dict format
+            if isinstance(metadata, list):
+                # Migrate from old format
+                logger.info("Migrating from old id_map format to new format")
+                self.id_map = {file_id: idx for idx, file_id in enumerate(metadata)}
+                self.reverse_id_map = {idx: file_id for idx, file_id in enumerate(metadata)}
+            else:
+                self.id_map = metadata.get("id_map", {})
+                self.reverse_id_map = metadata.get("reverse_id_map", {})
+
+    def _load_model(self) -> SentenceTransformer:
+        """
+        Load the embedding model with the configured backend and device.
+
+        MODEL_BACKEND=onnx or openvino runs the exported model (optionally a
+        quantized file via MODEL_FILE_NAME). The torch backend uses FP16 on
+        CUDA. Falls back to the default torch model if the backend fails.
+
+        Returns:
+            Loaded SentenceTransformer
+        """
+        kwargs = {}
+        device = Config.MODEL_DEVICE or None
+        if Config.MODEL_BACKEND in ("onnx", "openvino"):
+            kwargs["backend"] = Config.MODEL_BACKEND
+            if Config.MODEL_FILE_NAME:
+                kwargs["model_kwargs"] = {"file_name": Config.MODEL_FILE_NAME}
+        else:
+            import torch
+            if device is None and torch.cuda.is_available():
+                device = "cuda"
+            if device == "cuda":
+                kwargs["model_kwargs"] = {"torch_dtype": torch.float16}
+
+        logger.info(
+            f"Loading model: {Config.MODEL_NAME} "
+            f"(backend={Config.MODEL_BACKEND}, device={device or 'cpu'})"
+        )
+        try:
+            return SentenceTransformer(Config.MODEL_NAME, device=device, **kwargs)
+        except Exception as e:
+            if not kwargs:
+                raise
+            logger.warning(f"Failed to load model with {kwargs}: {e}. Falling back to torch backend")
+            return SentenceTransformer(Config.MODEL_NAME)
+
+    def _warm_up(self):
+        """Run one encode so the first request does not pay allocation/JIT cost."""
+        try:
+            self._encode_batch(["warm up"])
+        except Exception as e:
+            logger.warning(f"Model warm-up failed: {e}")
+        kernels.warm_up()
+
+    def _target_index_type(self, index: Optional[faiss.Index] = None) -> str:
+        """
+        Resolve the index type to use for an index.
+
+        INDEX_TYPE=auto keeps exact flat search for small corpora and switches
+        to HNSW once the index holds HNSW_PROMOTE_AT vectors. An index that is
+        already HNSW stays HNSW.
+
+        Args:
+            index: Index to resolve for; defaults to the current index
+
+        Returns:
+            "flat" or "hnsw"
+        """
+        if Config.INDEX_TYPE != "auto":
+            return Config.INDEX_TYPE
+        index = index if index is not None else self.index
+        if index is None:
+            return "flat"
+        if self._is_hnsw(index) or index.ntotal >= Config.HNSW_PROMOTE_AT:
+            return "hnsw"
+        return "flat"
+
+    def _create_index(self, index_type: Optional[str] = None) -> faiss.Index:
+        """
+        Create an empty FAISS index for the configured INDEX_TYPE and INDEX_ENCODING.
+
+        Embeddings are L2-normalized, so inner product equals cosine similarity.
+        With INDEX_ENCODING=fp16 vectors are stored as half floats, halving
+        memory and the bytes scanned per query; int8 quarters them. The base index is wrapped in
+        IndexIDMap2 to keep stable vector IDs that can be reconstructed by ID.
+
+        Args:
+            index_type: "flat" or "hnsw"; defaults to the configured type
+
+        Returns:
+            Empty IndexIDMap2-wrapped index
+        """
+        qtype = _SCALAR_QUANTIZERS.get(Config.INDEX_ENCODING)
+        if (index_type or self._target_index_type()) == "hnsw":
+            if qtype is not None:
+                base_index = faiss.IndexHNSWSQ(
+                    Config.EMBEDDING_DIM, qtype, Config.HNSW_M, faiss.METRIC_INNER_PRODUCT
+                )
+            else:
+                base_index = faiss.IndexHNSWFlat(
+                    Config.EMBEDDING_DIM, Config.HNSW_M, faiss.METRIC_INNER_PRODUCT
+                )
+            base_index.hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+        elif qtype is not None:
+            base_index = faiss.IndexScalarQuantizer(
+                Config.EMBEDDING_DIM, qtype, faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            base_index = faiss.IndexFlatIP(Config.EMBEDDING_DIM)
+
+        if not base_index.is_trained:
+            # int8 codes map a per-dimension [min, max] range onto 256 levels.
+            # Normalized embeddings lie in [-1, 1], so train on those bounds
+            # instead of waiting for data; fp16 needs no training.
+            bounds = np.array(
+                [[-1.0] * Config.EMBEDDING_DIM, [1.0] * Config.EMBEDDING_DIM],
+                dtype=np.float32,
+            )
+            base_index.train(bounds)
+        return faiss.IndexIDMap2(base_index)
+
+    def _index_matches_config(self, index: faiss.Index) -> bool:
+        """Check whether a loaded index has the configured type, encoding and metric."""
+        if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            return False
+        base_index = faiss.downcast_index(index.index)
+        qtype = _SCALAR_QUANTIZERS.get(Config.INDEX_ENCODING)
+        if self._target_index_type(index) == "hnsw":
+            if qtype is not None:
+                if not isinstance(base_index, faiss.IndexHNSWSQ):
+                    return False
+                storage = faiss.downcast_index(base_index.storage)
+                return storage.sq.qtype == qtype
+            return isinstance(base_index, faiss.IndexHNSWFlat)
+        if qtype is not None:
+            return (
+                isinstance(base_index, faiss.IndexScalarQuantizer)
+                and base_index.sq.qtype == qtype
+            )
+        return isinstance(base_index, faiss.IndexFlat)
+
+    def _rebuild_index(self, old_index: faiss.Index) -> faiss.Index:
+        """
+        Copy the live vectors of an existing index into a new configured index.
+
+        Args:
+            old_index: Loaded IndexIDMap-wrapped index
+
+        Returns:
+            New index containing the same vector IDs
+        """
+        new_index = self._create_index(self._target_index_type(old_index))
+        if old_index.ntotal == 0:
+            return new_index
+
+        base_index = faiss.downcast_index(old_index.index)
+        vectors = base_index.reconstruct_n(0, old_index.ntotal)
+        vector_ids = faiss.vector_to_array(old_index.id_map)
+
+        # Drop vectors whose documents were already removed
+        live = np.array([vid in self.reverse_id_map for vid in vector_ids], dtype=bool)
+        if live.any():
+            new_index.add_with_ids(vectors[live], vector_ids[live])
+        logger.info(f"Rebuilt index with {new_index.ntotal} vectors")
+        return new_index
+
+    @staticmethod
+    def _is_hnsw(index: faiss.Index) -> bool:
+        """Whether an IndexIDMap-wrapped index has an HNSW base."""
+        return isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW)
+
+    def _supports_removal(self) -> bool:
+        """Whether the base index can delete vectors (HNSW cannot)."""
+        return not self._is_hnsw(self.index)
+
+    def _promote_if_needed(self):
+        """
+        Rebuild a flat index as HNSW once INDEX_TYPE=auto calls for it.
+
+        Runs from the snapshot thread so the rebuild is saved immediately.
+        Caller must hold the write lock.
+        """
+        if Config.INDEX_TYPE != "auto" or self._is_hnsw(self.index):
+            return
+        if self.index.ntotal < Config.HNSW_PROMOTE_AT:
+            return
+        logger.info(f"Index reached {self.index.ntotal} vectors, rebuilding as HNSW")
+        self.index = self._rebuild_index(self.index)
+        self._tombstones = set()
+        self._ops_since_snapshot += 1
+
+    def _describe_index(self) -> str:
+        """Describe the index structure, e.g. IndexIDMap(IndexFlatIP)."""
+        if self.index is None:
+            return "None"
+        base_index = faiss.downcast_index(self.index.index)
+        return f"{type(self.index).__name__}({type(base_index).__name__})"
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode a batch of texts into normalized embeddings.
+
+        Args:
+            texts: Texts to encode
+
+        Returns:
+            Array of shape (len(texts), EMBEDDING_DIM)
+        """
+        # inference_mode skips autograd tracking and tensor version counters
+        with torch.inference_mode() if TORCH_AVAILABLE else nullcontext():
+            embeddings = self.model.encode(
+                texts,
+                batch_size=Config.ENCODE_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        # FAISS needs C-contiguous float32 or it copies on every call;
+        # FP16 models return float16 (no copy otherwise)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def _chunk_text(
+        self, text: str, window: int = _CHUNK_TOKENS, stride: int = _CHUNK_OVERLAP
+    ) -> List[str]:
+        """
+        Split a document into overlapping token windows.
+
+        Windows are cut from the original text at the tokenizer's character
+        offsets, so each chunk re-tokenizes to at most window tokens.
+
+        Args:
+            text: Stripped document text
+            window: Tokens per chunk, capped to the model's sequence limit
+            stride: Tokens shared between consecutive chunks
+
+        Returns:
+            Chunks in document order (the text itself if it fits one window)
+        """
+        limit = self.model.max_seq_length
+        if limit:
+            window = min(window, limit - 2)  # room for [CLS] and [SEP]
+        # Every token covers at least one character
+        if len(text) <= window:
+            return [text]
+
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+            return [text]
+        offsets = tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True
+        )["offset_mapping"]
+        if len(offsets) <= window:
+            return [text]
+
+        step = max(1, window - stride)
+        chunks = []
+        for start in range(0, len(offsets) - stride, step):
+            end = min(start + window, len(offsets))
+            chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+            if len(chunks) == _MAX_CHUNKS:
+                logger.info(f"Document truncated to {_MAX_CHUNKS} chunks for embedding")
+                break
+        return chunks
+
+    def _encode_document(self, chunks: List[np.ndarray]) -> np.ndarray:
+        """
+        Mean-pool chunk embeddings into one normalized document embedding.
+
+        Args:
+            chunks: (1, d) embeddings of the document's chunks
+
+        Returns:
+            Embedding as a (1, d) float32 array
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+        return kernels.mean_pool_normalize(np.vstack(chunks))
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a search query, serving repeated queries from the LRU cache.
+
+        The cache key is case-insensitive because the model's tokenizer
+        lowercases its input (all-MiniLM-L6-v2 is uncased).
+
+        Args:
+            query: Stripped query text
+
+        Returns:
+            Query embedding of shape (1, EMBEDDING_DIM)
+        """
+        if Config.QUERY_CACHE_SIZE <= 0:
+            return self.encoder.encode(query)
+
+        key = hashlib.blake2b(query.lower().encode("utf-8"), digest_size=16).hexdigest()
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+                self._query_cache_hits += 1
+                return embedding
+            self._query_cache_misses += 1
+
+        # Copy so the cache does not pin the whole batch array
+        embedding = self.encoder.encode(query).copy()
+        embedding.setflags(write=False)
+
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            self._query_cache.move_to_end(key)
+            while len(self._query_cache) > Config.QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def query_cache_info(self) -> dict:
+        """
+        Get query embedding cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, current size and max size
+        """
+        with self._query_cache_lock:
+            return {
+                "hits": self._query_cache_hits,
+                "misses": self._query_cache_misses,
+                "size": len(self._query_cache),
+                "maxsize": Config.QUERY_CACHE_SIZE,
+            }
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed documents without indexing them.
+
+        Args:
+            texts: Stripped, non-empty document texts
+
+        Returns:
+            Array of shape (len(texts), EMBEDDING_DIM)
+        """
+        # Queue every chunk of every text before waiting so they share
+        # model calls, then pool each document's chunks into one vector
+        futures = [
+            [self.encoder.submit(chunk) for chunk in self._chunk_text(text)]
+            for text in texts
+        ]
+        return np.vstack([
+            self._encode_document([future.result() for future in chunks])
+            for chunks in futures
+        ])
+
+    def embed_document(self, text: str) -> np.ndarray:
+        """
+        Embed one document without indexing it.
+
+        Args:
+            text: Document text
 
-    def index_document(self, file_id: str, text: str) -> Optional[int]:
+        Returns:
+            Embedding as a (1, d) float32 array
+        """
+        return self.embed_documents([text.strip()])
+
+    def index_document(
+        self, file_id: str, text: str, embedding: Optional[np.ndarray] = None
+    ) -> Optional[int]:
         """
         Index a document with its text content.
 
         Args:
             file_id: Unique file identifier
             text: Text content to index
+            embedding: Precomputed (1, d) embedding from embed_document
 
         Returns:
             Vector ID (FAISS index position) if indexed successfully, None if already indexed or failed
         """
-        if not text or not text.strip():
-            logger.warning(f"Empty text for file {file_id}, skipping indexing")
-            return None
+        return self.index_documents([(file_id, text)], embedding)[0]
+
+    def index_documents(
+        self,
+        documents: List[Tuple[str, str]],
+        embeddings: Optional[np.ndarray] = None,
+    ) -> List[Optional[int]]:
+        """
+        Index several documents with one encode pass and one index update.
+
+        All embeddings are added with a single add_with_ids call under a single
+        write-lock acquisition, instead of one call and one lock per document.
 
-        # Check if already indexed
-        if file_id in self.id_map:
-            logger.info(f"Document {file_id} already indexed, returning existing vector ID")
-            # Return the existing vector ID
-            return self.id_map[file_id]
+        Args:
+            documents: List of (file_id, text) pairs
+            embeddings: Optional precomputed embeddings, one row per document
+
+        Returns:
+            Vector ID for each document in input order (None for empty text)
+        """
+        results: List[Optional[int]] = [None] * len(documents)
+        pending: dict = {}  # file_id → (input positions, stripped text)
+        for position, (file_id, text) in enumerate(documents):
+            if not text or not text.strip():
+                logger.warning(f"Empty text for file {file_id}, skipping indexing")
+                continue
+
+            # Check if already indexed
+            if file_id in self.id_map:
+                logger.info(f"Document {file_id} already indexed, returning existing vector ID")
+                results[position] = self.id_map[file_id]
+                continue
+
+            pending.setdefault(file_id, ([], text.strip()))[0].append(position)
+
+        if not pending:
+            return results
 
         try:
-            # Generate embedding
-            embedding = self.model.encode(
-                text.strip(),
-                convert_to_numpy=True,
-                normalize_embeddings=True
-            ).reshape(1, -1)
+            if embeddings is None:
+                embeddings = self.embed_documents([text for _, text in pending.values()])
+            else:
+                rows = [positions[0] for positions, _ in pending.values()]
+                embeddings = np.ascontiguousarray(embeddings[rows], dtype=np.float32)
 
             # Thread-safe index update
-            with self.index_lock:
-                # Get next vector ID
-                vector_id = self.next_vector_id
-                self.next_vector_id += 1
+            with self.index_lock.gen_wlock():
+                new_rows = []
+                new_ids = []
+                assigned = []
+                file_ids = list(pending)
+                duplicates = self._find_near_duplicates(embeddings)
+                for row, file_id in enumerate(file_ids):
+                    # Re-check: a concurrent call may have indexed it meanwhile
+                    vector_id = self.id_map.get(file_id)
+                    if vector_id is None and duplicates[row] is not None:
+                        # Share the existing vector instead of adding a copy
+                        vector_id = duplicates[row]
+                        self._link(file_id, vector_id)
+                        self._append_wal(_WAL_ALIAS, vector_id, file_id, flush=False)
+                        logger.info(
+                            f"Document {file_id} is a near duplicate of "
+                            f"{self.reverse_id_map[vector_id]}, sharing vector ID {vector_id}"
+                        )
+                    elif vector_id is None:
+                        vector_id = self._vector_id_for(file_id, new_ids)
+                        new_rows.append(row)
+                        new_ids.append(vector_id)
+                    assigned.append(vector_id)
 
-                # Add to FAISS index with ID mapping
-                # IndexIDMap requires numpy array of IDs
-                vector_ids = np.array([vector_id], dtype=np.int64)
-                self.index.add_with_ids(embedding, vector_ids)
+                if new_ids:
+                    # Add to FAISS index with ID mapping
+                    # IndexIDMap requires numpy array of IDs. Only gather rows
+                    # when some were skipped; otherwise pass the array as is.
+                    if len(new_rows) < len(embeddings):
+                        new_embeddings = embeddings[new_rows]
+                    else:
+                        new_embeddings = embeddings
+                    self.index.add_with_ids(
+                        new_embeddings, np.array(new_ids, dtype=np.int64)
+                    )
 
-                # Store metadata mapping
-                self.id_map[file_id] = vector_id
-                self.reverse_id_map[vector_id] = file_id
+                    # Store metadata mapping and persist to the write-ahead log
+                    for row, vector_id in zip(new_rows, new_ids):
+                        file_id = file_ids[row]
+                        self._link(file_id, vector_id)
+                        self._append_wal(
+                            _WAL_ADD, vector_id, file_id, embeddings[row], flush=False
+                        )
+                self._wal.flush()
 
-                # Persist to disk
-                self._save_index()
+            for (positions, _), vector_id in zip(pending.values(), assigned):
+                for position in positions:
+                    results[position] = vector_id
 
-            logger.info(f"Indexed document {file_id} with vector ID {vector_id}")
-            return vector_id
+            logger.info(f"Indexed {len(new_ids)} documents")
+            return results
 
         except Exception as e:
-            logger.error(f"Indexing failed for {file_id}: {str(e)}")
+            logger.error(f"Indexing failed for {', '.join(pending)}: {str(e)}")
             raise
 
-    def search(self, query: str, k: int = 5) -> List[str]:
+    def _find_near_duplicates(self, embeddings: np.ndarray) -> List[Optional[int]]:
+        """
+        Find an indexed vector within NEAR_DUPLICATE_THRESHOLD of each embedding.
+
+        Caller must hold the index lock.
+
+        Args:
+            embeddings: (n, d) float32 normalized embeddings
+
+        Returns:
+            Vector ID of the nearest live match per row, or None
+        """
+        threshold = Config.NEAR_DUPLICATE_THRESHOLD
+        if threshold <= 0 or self.index.ntotal == 0:
+            return [None] * len(embeddings)
+
+        # A few extra candidates so HNSW tombstones do not hide a live match
+        k = min(self.index.ntotal, 4)
+        similarities, vector_ids = self.index.search(embeddings, k)
+        matches: List[Optional[int]] = []
+        for row_similarities, row_ids in zip(similarities, vector_ids):
+            match = None
+            for similarity, vector_id in zip(row_similarities, row_ids):
+                if similarity < threshold:
+                    break
+                if vector_id in self.reverse_id_map:
+                    match = int(vector_id)
+                    break
+            matches.append(match)
+        return matches
+
+    def _link(self, file_id: str, vector_id: int):
+        """Map a file_id to a vector, as its owner or as a near duplicate."""
+        self.id_map[file_id] = vector_id
+        if vector_id in self.reverse_id_map:
+            self.duplicate_ids.setdefault(vector_id, []).append(file_id)
+        else:
+            self.reverse_id_map[vector_id] = file_id
+
+    def _unlink(self, file_id: str) -> bool:
+        """
+        Drop a file_id's mapping.
+
+        Args:
+            file_id: Indexed file ID
+
+        Returns:
+            True if no other document shares the vector (it can be removed)
+        """
+        vector_id = self.id_map.pop(file_id)
+        duplicates = self.duplicate_ids.get(vector_id)
+        if duplicates:
+            if self.reverse_id_map[vector_id] == file_id:
+                # Promote the oldest duplicate to owner of the vector
+                self.reverse_id_map[vector_id] = duplicates.pop(0)
+            else:
+                duplicates.remove(file_id)
+            if not duplicates:
+                del self.duplicate_ids[vector_id]
+            return False
+        del self.reverse_id_map[vector_id]
+        return True
+
+    def alias(self, file_id: str, existing_file_id: str) -> Optional[int]:
+        """
+        Index a document as an exact duplicate of an indexed one.
+
+        The new file_id shares the existing document's vector, so nothing is
+        extracted or encoded.
+
+        Args:
+            file_id: File ID to index
+            existing_file_id: Indexed file ID with identical content
+
+        Returns:
+            Shared vector ID, or None if existing_file_id is not indexed
+        """
+        with self.index_lock.gen_wlock():
+            if file_id in self.id_map:
+                return self.id_map[file_id]
+            vector_id = self.id_map.get(existing_file_id)
+            if vector_id is None:
+                return None
+            self._link(file_id, vector_id)
+            self._append_wal(_WAL_ALIAS, vector_id, file_id)
+        logger.info(f"Document {file_id} duplicates {existing_file_id}, sharing vector ID {vector_id}")
+        return vector_id
+
+    def search(
+        self, query: str, k: int = 5, threshold: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
         """
         Search for similar documents.
 
         Args:
             query: Search query text
             k: Number of results to return
+            threshold: Optional minimum cosine similarity; results are
+                ordered by similarity, so mapping stops at the first one below
 
         Returns:
-            List of file IDs ordered by similarity
+            List of (file ID, cosine similarity) pairs ordered by similarity
         """
         if not query or not query.strip():
             return []
@@ -152,32 +846,48 @@ class SemanticIndexer:
             return []
 
         try:
-            # Generate query embedding
-            query_embedding = self.model.encode(
-                query.strip(),
-                convert_to_numpy=True,
-                normalize_embeddings=True
-            ).reshape(1, -1)
+            # Generate query embedding (cached, batched on miss)
+            query_embedding = self._encode_query(query.strip())
 
             # Search in FAISS (thread-safe read)
-            with self.index_lock:
-                k = min(k, self.index.ntotal)
-                if k == 0:
+            with self.index_lock.gen_rlock():
+                if self.index.ntotal == 0:
                     return []
-                distances, vector_ids = self.index.search(query_embedding, k)
+                # Over-fetch by the number of vectors left behind by removals
+                # (HNSW cannot delete, so removed documents stay as tombstones)
+                tombstones = self.index.ntotal - len(self.reverse_id_map)
+                k_search = min(k + max(tombstones, 0), self.index.ntotal)
+                params = None
+                if not self._supports_removal():
+                    params = faiss.SearchParametersHNSW(
+                        efSearch=max(k_search * 4, Config.HNSW_EF_SEARCH)
+                    )
+                similarities, vector_ids = self.index.search(
+                    query_embedding, k_search, params=params
+                )
 
             # Map FAISS vector IDs to file_ids
             # FAISS returns -1 for invalid/removed IDs
-            file_ids = []
-            for vector_id in vector_ids[0]:
+            # Documents deduplicated onto a vector are returned together
+            # with the same score
+            matches = []
+            for similarity, vector_id in zip(similarities[0].tolist(), vector_ids[0].tolist()):
+                if threshold is not None and similarity < threshold:
+                    break
                 if vector_id >= 0 and vector_id in self.reverse_id_map:
-                    file_id = self.reverse_id_map[vector_id]
-                    file_ids.append(file_id)
+                    matches.append((self.reverse_id_map[vector_id], similarity))
+                    matches.extend(
+                        (file_id, similarity)
+                        for file_id in self.duplicate_ids.get(vector_id, ())
+                    )
+                    if len(matches) >= k:
+                        break
+            matches = matches[:k]
 
             logger.info(
-                f"Search returned {len(file_ids)} results for query: {query[:50]}..."
+                f"Search returned {len(matches)} results for query: {query[:50]}..."
             )
-            return file_ids
+            return matches
 
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
@@ -198,20 +908,25 @@ class SemanticIndexer:
             return False
 
         try:
-            with self.index_lock:
+            with self.index_lock.gen_wlock():
                 # Get vector ID for this file
                 vector_id = self.id_map[file_id]
 
-                # Remove from FAISS index using remove_ids (efficient with IndexIDMap)
-                vector_ids_to_remove = np.array([vector_id], dtype=np.int64)
-                self.index.remove_ids(vector_ids_to_remove)
+                # Remove from metadata mappings; the vector stays while
+                # near-duplicate documents still share it
+                freed = self._unlink(file_id)
 
-                # Remove from metadata mappings
-                del self.id_map[file_id]
-                del self.reverse_id_map[vector_id]
+                # Remove from FAISS index using remove_ids (efficient with IndexIDMap).
+                # HNSW graphs do not support removal; the vector stays as a
+                # tombstone that search skips because it has no mapping.
+                if freed and self._supports_removal():
+                    vector_ids_to_remove = np.array([vector_id], dtype=np.int64)
+                    self.index.remove_ids(vector_ids_to_remove)
+                elif freed:
+                    self._tombstones.add(vector_id)
 
-                # Persist to disk
-                self._save_index()
+                # Persist to the write-ahead log
+                self._append_wal(_WAL_REMOVE, vector_id, file_id)
 
             logger.info(f"Removed document {file_id} (vector ID {vector_id}) from index")
             return True
@@ -221,26 +936,266 @@ class SemanticIndexer:
             return False
 
     def _save_index(self):
-        """Save FAISS index and metadata to disk."""
+        """Save FAISS index and metadata to disk. Caller must hold the write lock."""
+        self._write_snapshot(*self._serialize_snapshot())
+
+    def _serialize_snapshot(self) -> Tuple[np.ndarray, bytes]:
+        """
+        Serialize the index and id map in memory. Caller must hold the write lock.
+
+        Returns:
+            (FAISS index bytes, id map record bytes)
+        """
+        index_bytes = faiss.serialize_index(self.index)
+
+        # Save the id map as length-prefixed (file_id, vector_id) records
+        parts = [_IDS_COUNT.pack(len(self.id_map))]
+        for file_id, vector_id in self.id_map.items():
+            file_id_bytes = file_id.encode("utf-8")
+            parts.append(_IDS_LENGTH.pack(len(file_id_bytes)))
+            parts.append(file_id_bytes)
+            parts.append(_IDS_VECTOR.pack(vector_id))
+        return index_bytes, b"".join(parts)
+
+    def _write_snapshot(self, index_bytes: np.ndarray, ids_bytes: bytes):
+        """
+        Write serialized snapshot data to disk. Needs no lock.
+
+        Args:
+            index_bytes: Serialized FAISS index
+            ids_bytes: Serialized id map records
+        """
         try:
             index_path = Config.get_index_path()
             meta_path = Config.get_meta_path()
 
-            faiss.write_index(self.index, index_path)
-            # Save metadata in new format
-            metadata = {
-                "id_map": self.id_map,
-                "reverse_id_map": self.reverse_id_map,
-                "next_vector_id": self.next_vector_id,
-            }
-            with open(meta_path, "wb") as f:
-                pickle.dump(metadata, f)
+            # Write to temporary files and rename so a crash never leaves a
+            # half-written snapshot behind (the WAL is truncated afterwards)
+            with open(index_path + ".tmp", "wb") as f:
+                f.write(index_bytes)
+            with open(meta_path + ".tmp", "wb") as f:
+                f.write(ids_bytes)
+
+            os.replace(index_path + ".tmp", index_path)
+            os.replace(meta_path + ".tmp", meta_path)
+
+            # Earlier id map formats have been superseded
+            for old_meta_path in (Config.get_npy_meta_path(), Config.get_legacy_meta_path()):
+                if os.path.exists(old_meta_path):
+                    os.remove(old_meta_path)
 
             logger.debug(f"Saved index to {index_path} and metadata to {meta_path}")
         except Exception as e:
             logger.error(f"Failed to save index: {str(e)}")
             raise
 
+    @staticmethod
+    def _open_wal():
+        """
+        Open the write-ahead log for appending.
+
+        With WAL_SYNC=true the file is opened with O_DSYNC, so each flush
+        (one per index batch) returns only once the records are on stable
+        storage instead of in the OS page cache.
+
+        Returns:
+            Binary file object positioned at the end of the log
+        """
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        if Config.WAL_SYNC:
+            flags |= getattr(os, "O_DSYNC", getattr(os, "O_SYNC", 0))
+        fd = os.open(Config.get_wal_path(), flags, 0o644)
+        return os.fdopen(fd, "ab")
+
+    def _append_wal(
+        self,
+        op: bytes,
+        vector_id: int,
+        file_id: str,
+        embedding: Optional[np.ndarray] = None,
+        flush: bool = True,
+    ):
+        """
+        Append one change to the write-ahead log. Caller must hold the write lock.
+
+        Args:
+            op: _WAL_ADD, _WAL_ALIAS or _WAL_REMOVE
+            vector_id: FAISS vector ID
+            file_id: File ID
+            embedding: float32 embedding for add records
+            flush: Flush the log after writing (batch writers flush once)
+        """
+        file_id_bytes = file_id.encode("utf-8")
+        record = _WAL_HEADER.pack(op, vector_id, len(file_id_bytes)) + file_id_bytes
+        if op == _WAL_ADD:
+            record += np.ascontiguousarray(embedding, dtype=np.float32).tobytes()
+        self._wal.write(record)
+        if flush:
+            self._wal.flush()
+
+        self._ops_since_snapshot += 1
+        if self._ops_since_snapshot >= Config.SNAPSHOT_EVERY_OPS:
+            self._snapshot_requested.set()
+
+    def _replay_wal(self) -> int:
+        """
+        Apply write-ahead log records on top of the loaded snapshot.
+
+        Replay is idempotent: vectors already present in the snapshot are not
+        added twice, so a crash between writing the index and truncating the
+        log is safe.
+
+        Returns:
+            Number of records applied
+        """
+        wal_path = Config.get_wal_path()
+        if not os.path.exists(wal_path) or os.path.getsize(wal_path) == 0:
+            return 0
+
+        with open(wal_path, "rb") as f:
+            data = f.read()
+
+        vector_bytes = Config.EMBEDDING_DIM * 4
+        present = set(faiss.vector_to_array(self.index.id_map).tolist())
+        offset = 0
+        applied = 0
+        while offset + _WAL_HEADER.size <= len(data):
+            op, vector_id, id_len = _WAL_HEADER.unpack_from(data, offset)
+            end = offset + _WAL_HEADER.size + id_len
+            if op == _WAL_ADD:
+                end += vector_bytes
+            if end > len(data):
+                break
+            file_id = data[offset + _WAL_HEADER.size:offset + _WAL_HEADER.size + id_len].decode("utf-8")
+
+            if op == _WAL_ADD:
+                if vector_id not in present:
+                    # (1, d) view straight over the log bytes
+                    embedding = np.ndarray(
+                        (1, Config.EMBEDDING_DIM), dtype=np.float32,
+                        buffer=data, offset=end - vector_bytes,
+                    )
+                    self.index.add_with_ids(embedding, np.array([vector_id], dtype=np.int64))
+                    present.add(vector_id)
+                if file_id not in self.id_map:
+                    self._link(file_id, vector_id)
+            elif op == _WAL_ALIAS:
+                if file_id not in self.id_map:
+                    self._link(file_id, vector_id)
+            elif op == _WAL_REMOVE:
+                freed = file_id in self.id_map and self._unlink(file_id)
+                if freed and vector_id in present and self._supports_removal():
+                    self.index.remove_ids(np.array([vector_id], dtype=np.int64))
+                    present.discard(vector_id)
+            else:
+                logger.warning(f"Unknown WAL record at offset {offset}, stopping replay")
+                break
+
+            offset = end
+            applied += 1
+
+        if offset < len(data):
+            logger.warning(f"Ignoring {len(data) - offset} trailing bytes of incomplete WAL record")
+        logger.info(f"Replayed {applied} WAL records")
+        return applied
+
+    def _truncate_wal_file(self):
+        """Empty the write-ahead log after a snapshot."""
+        if self._wal is not None:
+            self._wal.truncate(0)
+        elif os.path.exists(Config.get_wal_path()):
+            open(Config.get_wal_path(), "wb").close()
+
+    def _trim_wal(self, offset: int):
+        """
+        Drop the WAL records before offset, keeping any appended after it.
+
+        Caller must hold the write lock.
+
+        Args:
+            offset: WAL size when the snapshot was serialized
+        """
+        if self._wal is None:
+            self._truncate_wal_file()
+            return
+        self._wal.flush()
+        if self._wal.tell() == offset:
+            self._wal.truncate(0)
+            return
+
+        wal_path = Config.get_wal_path()
+        with open(wal_path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+        with open(wal_path + ".tmp", "wb") as f:
+            f.write(tail)
+        self._wal.close()
+        os.replace(wal_path + ".tmp", wal_path)
+        self._wal = self._open_wal()
+
+    def snapshot(self):
+        """
+        Write a full index snapshot and reset the write-ahead log.
+
+        Only serialization holds the write lock; the disk writes happen
+        after releasing it so searches and inserts are not blocked on I/O.
+        Records logged meanwhile stay in the WAL for the next snapshot.
+        """
+        with self._snapshot_lock:
+            with self.index_lock.gen_wlock():
+                self._promote_if_needed()
+                ops = self._ops_since_snapshot
+                if ops == 0:
+                    return
+                index_bytes, ids_bytes = self._serialize_snapshot()
+                if self._wal is not None:
+                    self._wal.flush()
+                wal_offset = self._wal.tell() if self._wal is not None else 0
+                self._ops_since_snapshot = 0
+
+            try:
+                self._write_snapshot(index_bytes, ids_bytes)
+            except Exception:
+                with self.index_lock.gen_wlock():
+                    self._ops_since_snapshot += ops
+                raise
+
+            with self.index_lock.gen_wlock():
+                self._trim_wal(wal_offset)
+        logger.info("Saved index snapshot")
+
+    def _start_snapshot_thread(self):
+        """Start the background thread that periodically snapshots the index."""
+        self._snapshot_thread = Thread(
+            target=self._snapshot_loop, name="index-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def _snapshot_loop(self):
+        """Snapshot every SNAPSHOT_INTERVAL_SECONDS or SNAPSHOT_EVERY_OPS changes."""
+        while not self._stop_snapshots.is_set():
+            self._snapshot_requested.wait(Config.SNAPSHOT_INTERVAL_SECONDS)
+            self._snapshot_requested.clear()
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"Index snapshot failed: {e}")
+
+    def close(self):
+        """Stop background workers and flush pending changes to disk."""
+        atexit.unregister(self.close)
+        self.encoder.stop()
+        self._stop_snapshots.set()
+        self._snapshot_requested.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+        self.snapshot()
+        with self.index_lock.gen_wlock():
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+
     def get_stats(self) -> dict:
         """
         Get index statistics.
@@ -253,6 +1208,12 @@ class SemanticIndexer:
             "documents_indexed": len(self.id_map),
             "model": Config.MODEL_NAME,
             "embedding_dimension": Config.EMBEDDING_DIM,
-            "index_type": "IndexIDMap(IndexFlatL2)" if self.index else "None",
+            "index_type": self._describe_index(),
+            "query_cache": self.query_cache_info(),
         }
 
+
+@lru_cache(maxsize=1)
+def get_semantic_indexer() -> SemanticIndexer:
+    """Get the process-wide semantic indexer."""
+    return SemanticIndexer()
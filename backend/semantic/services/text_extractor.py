@@ -1,10 +1,21 @@
 """Text extraction service for various file formats."""
 
+import codecs
 import logging
 import io
-from typing import Optional
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Optional
 import PyPDF2
 
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+    logging.warning("pypdfium2 not available. Falling back to PyPDF2 for PDF extraction.")
+
 try:
     import mammoth
     MAMMOTH_AVAILABLE = True
@@ -12,8 +23,83 @@ except ImportError:
     MAMMOTH_AVAILABLE = False
     logging.warning("mammoth not available. DOCX extraction will not work.")
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
+# PDFs with at least this many pages are split into page ranges extracted in
+# separate processes. PDFium is not thread-safe, so threads cannot be used; the
+# page-count probe and smaller PDFs run in-process under _pdfium_lock.
+_PARALLEL_MIN_PAGES = 16
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+# PDFium must not be entered from two threads at once, even for different
+# documents. Every in-process call (open, page and textpage access, close)
+# happens under this lock; uploads run on many threads concurrently.
+_pdfium_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool for PDF page extraction."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn: forking a process that holds model and FAISS threads is unsafe
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=Config.PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_pool
+
+
+def _pdfium_page_texts(pdf, start: int, stop: int) -> List[str]:
+    """
+    Read the text of a range of pages from an open PDFium document.
+
+    In the service process the caller must hold _pdfium_lock.
+
+    Args:
+        pdf: Open pdfium.PdfDocument
+        start: First page index
+        stop: Page index to stop before
+
+    Returns:
+        Text of each page in the range
+    """
+    texts = []
+    for page_index in range(start, stop):
+        page = pdf[page_index]
+        textpage = page.get_textpage()
+        try:
+            texts.append(textpage.get_text_bounded())
+        finally:
+            textpage.close()
+            page.close()
+    return texts
+
+
+def _pdfium_extract_range(data: bytes, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of a page range in a worker process.
+
+    Pool workers are single-threaded, so no lock is taken here.
+
+    Args:
+        data: Full PDF content
+        start: First page index
+        stop: Page index to stop before
+
+    Returns:
+        Text of each page in the range
+    """
+    pdf = pdfium.PdfDocument(data)
+    try:
+        return _pdfium_page_texts(pdf, start, stop)
+    finally:
+        pdf.close()
+
 
 class TextExtractor:
     """Service for extracting text from various file formats."""
@@ -27,19 +113,36 @@ class TextExtractor:
             file_content: File content as bytes
             mime_type: MIME type of the file
 
+        Returns:
+            Extracted text or None if extraction fails or format not supported
+        """
+        return TextExtractor.extract_text_stream(io.BytesIO(file_content), mime_type)
+
+    @staticmethod
+    def extract_text_stream(stream: BinaryIO, mime_type: str) -> Optional[str]:
+        """
+        Extract text from a binary file object based on MIME type.
+
+        The stream is read from its current position, so callers spooling a
+        download to a temporary file can pass it without loading it into memory.
+
+        Args:
+            stream: Seekable binary file object with the file content
+            mime_type: MIME type of the file
+
         Returns:
             Extracted text or None if extraction fails or format not supported
         """
         try:
             if mime_type == "application/pdf":
-                return TextExtractor._extract_from_pdf(file_content)
+                return TextExtractor._extract_from_pdf(stream)
             elif mime_type in [
                 "application/msword",
                 "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
             ]:
-                return TextExtractor._extract_from_docx(file_content)
+                return TextExtractor._extract_from_docx(stream)
             elif mime_type == "text/plain":
-                return file_content.decode("utf-8", errors="ignore")
+                return TextExtractor._decode_text(stream.read())
             else:
                 logger.warning(f"Text extraction not supported for MIME type: {mime_type}")
                 return None
@@ -48,19 +151,110 @@ class TextExtractor:
             return None
 
     @staticmethod
-    def _extract_from_pdf(file_content: bytes) -> Optional[str]:
+    def _decode_text(data: bytes) -> str:
+        """
+        Decode plain text, honouring a byte order mark.
+
+        Pure ASCII content, checked with bytes.isascii in one C pass, is
+        decoded with the ASCII codec, which skips UTF-8 error handling.
+
+        Args:
+            data: Raw file content
+
+        Returns:
+            Decoded text (invalid bytes are dropped)
+        """
+        if data.isascii():
+            return data.decode("ascii")
+        if data.startswith(codecs.BOM_UTF8):
+            return data[len(codecs.BOM_UTF8):].decode("utf-8", errors="ignore")
+        if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return data.decode("utf-16", errors="ignore")
+        return data.decode("utf-8", errors="ignore")
+
+    @staticmethod
+    def _extract_from_pdf(stream: BinaryIO) -> Optional[str]:
         """
         Extract text from PDF file.
 
+        Uses PDFium (pypdfium2) when available, falling back to PyPDF2 if it
+        is not installed or cannot open the document.
+
+        Args:
+            stream: Seekable binary file object with the PDF content
+
+        Returns:
+            Extracted text or None if extraction fails
+        """
+        if PDFIUM_AVAILABLE:
+            start = stream.tell()
+            try:
+                return TextExtractor._extract_from_pdf_pdfium(stream)
+            except Exception as e:
+                logger.warning(f"PDFium extraction failed, retrying with PyPDF2: {e}")
+                stream.seek(start)
+        return TextExtractor._extract_from_pdf_pypdf2(stream)
+
+    @staticmethod
+    def _extract_from_pdf_pdfium(stream: BinaryIO) -> Optional[str]:
+        """
+        Extract text from a PDF with PDFium.
+
+        The page-count probe and extraction of PDFs below the parallel
+        threshold hold _pdfium_lock; the lock is released before large PDFs
+        are handed to the process pool, so other uploads are not blocked
+        while they are extracted.
+
+        Args:
+            stream: Seekable binary file object with the PDF content
+
+        Returns:
+            Extracted text or None if the PDF has no text
+
+        Raises:
+            pdfium.PdfiumError: If PDFium cannot open the document
+        """
+        start = stream.tell()
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(stream)
+            try:
+                page_count = len(pdf)
+                workers = min(Config.PDF_WORKERS, page_count // _PARALLEL_MIN_PAGES)
+                if workers < 2:
+                    page_texts = _pdfium_page_texts(pdf, 0, page_count)
+            finally:
+                pdf.close()
+
+        if workers >= 2:
+            # Each worker opens its own copy and extracts a contiguous range
+            stream.seek(start)
+            data = stream.read()
+            step = -(-page_count // workers)
+            starts = range(0, page_count, step)
+            stops = [min(first + step, page_count) for first in starts]
+            page_texts = []
+            for texts in _get_pdf_pool().map(
+                _pdfium_extract_range, [data] * len(starts), starts, stops
+            ):
+                page_texts.extend(texts)
+
+        extracted_text = "\n".join(text for text in page_texts if text)
+        logger.info(f"Extracted {len(extracted_text)} characters from PDF")
+        return extracted_text if extracted_text.strip() else None
+
+    @staticmethod
+    def _extract_from_pdf_pypdf2(stream: BinaryIO) -> Optional[str]:
+        """
+        Extract text from a PDF with PyPDF2.
+
         Args:
-            file_content: PDF file content as bytes
+            stream: Seekable binary file object with the PDF content
 
         Returns:
             Extracted text or None if extraction fails
         """
         try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            pdf_reader = PyPDF2.PdfReader(stream)
             text_parts = []
 
             for page_num in range(len(pdf_reader.pages)):
@@ -77,12 +271,12 @@ class TextExtractor:
             return None
 
     @staticmethod
-    def _extract_from_docx(file_content: bytes) -> Optional[str]:
+    def _extract_from_docx(stream: BinaryIO) -> Optional[str]:
         """
         Extract text from DOCX file.
 
         Args:
-            file_content: DOCX file content as bytes
+            stream: Seekable binary file object with the DOCX content
 
         Returns:
             Extracted text or None if extraction fails
@@ -92,8 +286,7 @@ class TextExtractor:
             return None
 
         try:
-            docx_file = io.BytesIO(file_content)
-            result = mammoth.extract_raw_text(docx_file)
+            result = mammoth.extract_raw_text(stream)
             extracted_text = result.value
             logger.info(f"Extracted {len(extracted_text)} characters from DOCX")
             return extracted_text if extracted_text.strip() else None
@@ -2,117 +2,204 @@
 Test script for the Semantic Search Service.
 Run this after starting the server with: uvicorn app:app --reload
 """
+import atexit
 import os
-import requests
-import json
+import orjson
+import threading
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.util.retry import Retry
 
 BASE_URL = "http://localhost:8000"
 
 # Get API key from environment variable
 API_KEY = os.getenv("API_KEY") or os.getenv("SEMANTIC_SERVICE_API_KEY")
 
-# Headers for protected endpoints
-def get_headers():
-    """Get headers with API key if available."""
-    if API_KEY:
-        return {"X-API-Key": API_KEY, "Content-Type": "application/json"}
-    return {"Content-Type": "application/json"}
+# Headers for protected endpoints, fixed for the whole run
+HEADERS = (
+    {"X-API-Key": API_KEY, "Content-Type": "application/json"}
+    if API_KEY
+    else {"Content-Type": "application/json"}
+)
+
+# Pretty-print response bodies only when VERBOSE is set
+VERBOSE = bool(os.getenv("VERBOSE"))
+
+# Shared pool so every call reuses keep-alive connections. Transient gateway
+# errors are retried; the final response is returned rather than raised so the
+# tests still report its status. Indexing is idempotent, so POST is safe.
+_retry = Retry(
+    total=3,
+    backoff_factor=0.1,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=["GET", "POST"],
+    raise_on_status=False,
+)
+POOL = urllib3.PoolManager(num_pools=1, maxsize=20, block=False, retries=_retry)
+atexit.register(POOL.clear)
+
+# Documents indexed by the test run as (file_id, text) pairs
+TEST_DOCUMENTS = (
+    ("doc1", "Python is a programming language used for web development and data science."),
+    ("doc2", "FastAPI is a modern web framework for building APIs with Python."),
+    ("doc3", "Machine learning involves training models on data to make predictions."),
+    ("doc4", "Semantic search uses embeddings to find similar documents."),
+    ("doc5", "FAISS is a library for efficient similarity search and clustering."),
+)
+
+# Concurrent probes; must not exceed the pool's maxsize
+MAX_WORKERS = 8
+_print_lock = threading.Lock()
+
+
+def report(lines):
+    """Print a test's output as one block so concurrent tests don't interleave."""
+    with _print_lock:
+        print("\n".join(lines))
+
+
+def get(path, headers=HEADERS):
+    """GET a service path over the shared pool."""
+    return POOL.request("GET", f"{BASE_URL}{path}", headers=headers)
+
+
+def post(path, payload, headers=HEADERS):
+    """POST a JSON payload to a service path over the shared pool."""
+    return POOL.request("POST", f"{BASE_URL}{path}", body=orjson.dumps(payload), headers=headers)
+
+
+def format_response(response):
+    """Describe a successful response: the pretty-printed body if VERBOSE, else its size."""
+    if VERBOSE:
+        data = orjson.loads(response.data)
+        return f"Response: {orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()}"
+    return f"  OK ({len(response.data)} bytes)"
+
+
+def format_error(response):
+    """Describe a failed response by its raw body."""
+    return f"Error: {response.data.decode(errors='replace')}"
 
 
 def test_health():
     """Test the health check endpoint."""
     print("\n=== Testing /health ===")
-    response = requests.get(f"{BASE_URL}/health")
-    print(f"Status: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
-    return response.status_code == 200
+    response = get("/health")
+    print(f"Status: {response.status}")
+    print(format_response(response))
+    return response.status == 200
 
 
 def test_stats():
     """Test the stats endpoint."""
     print("\n=== Testing /stats ===")
-    headers = get_headers()
-    response = requests.get(f"{BASE_URL}/stats", headers=headers)
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
+    response = get("/stats")
+    print(f"Status: {response.status}")
+    if response.status == 200:
+        print(format_response(response))
     else:
-        print(f"Error: {response.text}")
-    return response.status_code == 200
+        print(format_error(response))
+    return response.status == 200
 
 
 def test_index_document(file_id: str, text: str):
     """Test indexing a document."""
-    print(f"\n=== Testing /index (file_id: {file_id}) ===")
-    headers = get_headers()
-    response = requests.post(
-        f"{BASE_URL}/index",
-        json={"file_id": file_id, "text": text},
-        headers=headers
+    lines = [f"\n=== Testing /index (file_id: {file_id}) ==="]
+    response = post(
+        "/index",
+        {"file_id": file_id, "text": text}
+    )
+    lines.append(f"Status: {response.status}")
+    if response.status in [200, 201]:
+        lines.append(format_response(response))
+    else:
+        lines.append(format_error(response))
+    report(lines)
+    return response.status in [200, 201]
+
+
+def test_index_bulk(documents):
+    """
+    Test indexing several documents in one /index_bulk request.
+
+    Returns None when the server has no bulk endpoint, so callers can fall
+    back to one /index call per document.
+    """
+    lines = [f"\n=== Testing /index_bulk ({len(documents)} documents) ==="]
+    response = post(
+        "/index_bulk",
+        {"docs": [{"file_id": file_id, "text": text} for file_id, text in documents]}
     )
-    print(f"Status: {response.status_code}")
-    if response.status_code in [200, 201]:
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
+    lines.append(f"Status: {response.status}")
+    if response.status == 404:
+        lines.append("Bulk endpoint not available, indexing one document per request")
+        report(lines)
+        return None
+    if response.status == 200:
+        lines.append(format_response(response))
     else:
-        print(f"Error: {response.text}")
-    return response.status_code in [200, 201]
+        lines.append(format_error(response))
+    report(lines)
+    return response.status == 200
 
 
 def test_search(query: str, k: int = 5):
     """Test searching for documents."""
-    print(f"\n=== Testing /search (query: '{query}', k: {k}) ===")
-    headers = get_headers()
-    response = requests.post(
-        f"{BASE_URL}/search",
-        json={"query": query, "k": k},
-        headers=headers
+    lines = [f"\n=== Testing /search (query: '{query}', k: {k}) ==="]
+    response = post(
+        "/search",
+        {"query": query, "k": k}
     )
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
+    lines.append(f"Status: {response.status}")
+    if response.status == 200:
+        lines.append(format_response(response))
     else:
-        print(f"Error: {response.text}")
-    return response.status_code == 200
+        lines.append(format_error(response))
+    report(lines)
+    return response.status == 200
 
 
 def test_error_cases():
     """Test error handling."""
     print("\n=== Testing Error Cases ===")
-    headers = get_headers()
     
     # Empty query
     print("\n1. Testing empty query...")
-    response = requests.post(f"{BASE_URL}/search", json={"query": "", "k": 5}, headers=headers)
-    print(f"   Status: {response.status_code} (expected 400)")
+    response = post("/search", {"query": "", "k": 5})
+    print(f"   Status: {response.status} (expected 400)")
     
     # Invalid k
     print("\n2. Testing invalid k...")
-    response = requests.post(f"{BASE_URL}/search", json={"query": "test", "k": -1}, headers=headers)
-    print(f"   Status: {response.status_code} (expected 400)")
+    response = post("/search", {"query": "test", "k": -1})
+    print(f"   Status: {response.status} (expected 400)")
     
     # Missing file_id
     print("\n3. Testing missing file_id...")
-    response = requests.post(f"{BASE_URL}/index", json={"file_id": "", "text": "test"}, headers=headers)
-    print(f"   Status: {response.status_code} (expected 400)")
+    response = post("/index", {"file_id": "", "text": "test"})
+    print(f"   Status: {response.status} (expected 400)")
     
     # Empty text
     print("\n4. Testing empty text...")
-    response = requests.post(f"{BASE_URL}/index", json={"file_id": "test123", "text": ""}, headers=headers)
-    print(f"   Status: {response.status_code} (expected 400)")
+    response = post("/index", {"file_id": "test123", "text": ""})
+    print(f"   Status: {response.status} (expected 400)")
     
     # Missing API key
     print("\n5. Testing missing API key...")
-    response = requests.post(f"{BASE_URL}/index", json={"file_id": "test123", "text": "test"})
-    print(f"   Status: {response.status_code} (expected 401)")
+    response = post(
+        "/index",
+        {"file_id": "test123", "text": "test"},
+        headers={"Content-Type": "application/json"}
+    )
+    print(f"   Status: {response.status} (expected 401)")
     
     # Invalid API key
     print("\n6. Testing invalid API key...")
-    response = requests.post(
-        f"{BASE_URL}/index",
-        json={"file_id": "test123", "text": "test"},
-        headers={"X-API-Key": "invalid_key"}
+    response = post(
+        "/index",
+        {"file_id": "test123", "text": "test"},
+        headers={**HEADERS, "X-API-Key": "invalid_key"}
     )
-    print(f"   Status: {response.status_code} (expected 401)")
+    print(f"   Status: {response.status} (expected 401)")
 
 
 def main():
@@ -131,7 +218,7 @@ def main():
     # Check if server is running
     try:
         test_health()
-    except requests.exceptions.ConnectionError:
+    except urllib3.exceptions.MaxRetryError:
         print("\n❌ ERROR: Cannot connect to server!")
         print("Please start the server first with:")
         print("  cd backend/semantic")
@@ -146,16 +233,9 @@ def main():
     print("Indexing Test Documents")
     print("=" * 60)
     
-    test_documents = [
-        ("doc1", "Python is a programming language used for web development and data science."),
-        ("doc2", "FastAPI is a modern web framework for building APIs with Python."),
-        ("doc3", "Machine learning involves training models on data to make predictions."),
-        ("doc4", "Semantic search uses embeddings to find similar documents."),
-        ("doc5", "FAISS is a library for efficient similarity search and clustering."),
-    ]
-    
-    for file_id, text in test_documents:
-        test_index_document(file_id, text)
+    if test_index_bulk(TEST_DOCUMENTS) is None:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            list(executor.map(lambda doc: test_index_document(*doc), TEST_DOCUMENTS))
     
     # Test duplicate indexing
     print("\n" + "=" * 60)
@@ -168,9 +248,13 @@ def main():
     print("Search Tests")
     print("=" * 60)
     
-    test_search("web development", k=3)
-    test_search("machine learning models", k=2)
-    test_search("similarity search", k=5)
+    search_probes = [
+        ("web development", 3),
+        ("machine learning models", 2),
+        ("similarity search", 5),
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(lambda probe: test_search(*probe), search_probes))
     
     # Error cases
     print("\n" + "=" * 60)
@@ -0,0 +1,115 @@
+"""Content hashing helpers for uploaded files."""
+
+import hashlib
+import logging
+import platform
+import ssl
+from typing import Callable, Iterable, Optional
+
+from config import Config
+
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# BLAKE3 content hashes carry this prefix and a 30-byte digest, so they fit
+# the 64-character hash column and can never equal a SHA-256 hex digest
+BLAKE3_PREFIX = "b3:"
+_BLAKE3_DIGEST_SIZE = 30
+
+
+def _detect_sha_ni() -> bool:
+    """
+    Check whether the CPU advertises the SHA extensions (SHA-NI).
+
+    Returns:
+        True if the sha_ni flag is present, False otherwise or if unknown
+    """
+    if platform.system() != "Linux":
+        return False
+    try:
+        with open("/proc/cpuinfo", "r") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("flags"):
+                    return "sha_ni" in line.split()
+    except OSError:
+        pass
+    return False
+
+
+SHA_NI_AVAILABLE = _detect_sha_ni()
+OPENSSL_VERSION = ssl.OPENSSL_VERSION
+
+if SHA_NI_AVAILABLE:
+    logger.info(f"SHA-NI available, hashing through {OPENSSL_VERSION}")
+if Config.HASH_ALGORITHM == "blake3" and not BLAKE3_AVAILABLE:
+    logger.warning("HASH_ALGORITHM=blake3 but blake3 is not installed, using SHA-256")
+
+
+def sha256():
+    """
+    Create a SHA-256 hasher backed by OpenSSL.
+
+    hashlib.new routes to OpenSSL's EVP implementation, which dispatches to
+    SHA-NI at runtime when the CPU supports it. Content hashes are used for
+    deduplication, not as a security boundary.
+
+    Returns:
+        A new hashlib SHA-256 object
+    """
+    return hashlib.new("sha256", usedforsecurity=False)
+
+
+def sha256_stream(
+    chunks: Iterable[bytes],
+    sink: Optional[Callable[[bytes], object]] = None,
+) -> str:
+    """
+    Hash a stream of chunks without holding the whole content.
+
+    Args:
+        chunks: Consecutive chunks of the content
+        sink: Optional callable receiving each chunk after it is hashed
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    hasher = sha256()
+    for chunk in chunks:
+        hasher.update(chunk)
+        if sink is not None:
+            sink(chunk)
+    return hasher.hexdigest()
+
+
+def content_hash_stream(
+    chunks: Iterable[bytes],
+    sink: Optional[Callable[[bytes], object]] = None,
+) -> str:
+    """
+    Hash a stream of chunks with the configured HASH_ALGORITHM.
+
+    BLAKE3 hashes large chunks on several threads and is several times
+    faster than SHA-256. Digests of the two algorithms never compare equal,
+    so switching algorithms only stops deduplication against older uploads.
+
+    Args:
+        chunks: Consecutive chunks of the content
+        sink: Optional callable receiving each chunk after it is hashed
+
+    Returns:
+        SHA-256 hex digest, or BLAKE3_PREFIX followed by a BLAKE3 hex digest
+    """
+    if Config.HASH_ALGORITHM != "blake3" or not BLAKE3_AVAILABLE:
+        return sha256_stream(chunks, sink)
+
+    hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    for chunk in chunks:
+        hasher.update(chunk)
+        if sink is not None:
+            sink(chunk)
+    return BLAKE3_PREFIX + hasher.hexdigest(length=_BLAKE3_DIGEST_SIZE)
@@ -0,0 +1,68 @@
+"""Numeric kernels for embedding post-processing."""
+
+import logging
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _mean_pool_normalize_numpy(vecs: np.ndarray) -> np.ndarray:
+    """NumPy fallback for mean_pool_normalize."""
+    pooled = vecs.mean(axis=0)
+    norm = np.sqrt(np.dot(pooled, pooled))
+    return pooled / max(norm, 1e-12)
+
+
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True)
+    def _mean_pool_normalize_numba(vecs):
+        rows, dim = vecs.shape
+        pooled = np.zeros(dim, dtype=np.float32)
+        for row in range(rows):
+            for col in range(dim):
+                pooled[col] += vecs[row, col]
+        norm = np.float32(0.0)
+        for col in range(dim):
+            pooled[col] /= rows
+            norm += pooled[col] * pooled[col]
+        norm = max(np.sqrt(norm), np.float32(1e-12))
+        for col in range(dim):
+            pooled[col] /= norm
+        return pooled
+
+
+def mean_pool_normalize(vecs: np.ndarray) -> np.ndarray:
+    """
+    Average embedding rows and L2-normalize the result.
+
+    Uses a compiled numba loop when numba is installed (one pass, no
+    temporaries); otherwise NumPy.
+
+    Args:
+        vecs: (n, d) float32 array of embeddings
+
+    Returns:
+        Normalized (1, d) float32 embedding
+    """
+    vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+    if NUMBA_AVAILABLE:
+        pooled = _mean_pool_normalize_numba(vecs)
+    else:
+        pooled = _mean_pool_normalize_numpy(vecs)
+    return pooled.reshape(1, -1)
+
+
+def warm_up():
+    """Compile (or load from cache) the numba kernels ahead of the first document."""
+    if NUMBA_AVAILABLE:
+        try:
+            mean_pool_normalize(np.ones((2, 4), dtype=np.float32))
+        except Exception as e:
+            logger.warning(f"Kernel warm-up failed: {e}")
@@ -1,18 +1,96 @@
 """Input validation and sanitization utilities."""
 
 import re
+import string
 import logging
+from functools import lru_cache
 from typing import Optional
 from fastapi import HTTPException, status
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Size of the memo of valid IDs and MIME types; failures raise and are never cached
+_VALIDATION_CACHE_SIZE = 2048
+
+_FILE_NAME_SANITIZE_RE = re.compile(r'[^a-zA-Z0-9._-]')
+
+# Sanitized names are truncated to _MAX_FILE_NAME_LENGTH; longer raw input is
+# treated as abuse and rejected before any work is done on it
+_MAX_FILE_NAME_LENGTH = 255
+_MAX_RAW_FILE_NAME_LENGTH = 4096
+
+# Path segments removed by sanitize_path
+_UNSAFE_PATH_SEGMENTS = frozenset(('', '.', '..'))
+
+# Appwrite documentId limit; raw input may carry a little surrounding whitespace
+_MAX_FILE_ID_LENGTH = 36
+_FILE_ID_WHITESPACE_SLACK = 2
+
+# Allowed ID characters as bytes. IDs are checked by encoding to ASCII (non-ASCII
+# becomes '?') and deleting these with bytes.translate; anything left over is invalid.
+_FILE_ID_ALLOWED = (string.ascii_letters + string.digits + '._-').encode('ascii')
+_USER_ID_ALLOWED = (string.ascii_letters + string.digits + '_-').encode('ascii')
+
+# Config.ALLOWED_MIME_TYPES is a frozenset fixed at import; format its error listing once
+_ALLOWED_MIME_JOINED = ', '.join(sorted(Config.ALLOWED_MIME_TYPES))
+
+# Errors with a fixed detail are built once. Raise them through with_traceback(None)
+# so a shared instance does not accumulate frames from earlier raises.
+_FILE_NAME_REQUIRED = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="File name is required"
+)
+_FILE_NAME_TOO_LONG = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail=f"File name is too long. Maximum is {_MAX_RAW_FILE_NAME_LENGTH} characters."
+)
+_FILE_NAME_INVALID = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid file name"
+)
+_FILE_SIZE_INVALID = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="File size must be a positive integer"
+)
+_MIME_TYPE_REQUIRED = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="MIME type is required"
+)
+_FILE_ID_REQUIRED = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="File ID is required"
+)
+_FILE_ID_INVALID = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid file ID format. Only alphanumeric characters, periods, hyphens, and underscores are allowed."
+)
+_FILE_ID_BAD_START = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="File ID cannot start with a special character (period, hyphen, or underscore)."
+)
+_QUERY_EMPTY = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Search query cannot be empty"
+)
+_USER_ID_REQUIRED = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="User ID is required"
+)
+_USER_ID_INVALID = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid user ID format"
+)
+
+
+def _file_id_too_long(length: int) -> HTTPException:
+    """Build the error for a file ID over the Appwrite length limit."""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File ID is too long ({length} chars). Maximum is {_MAX_FILE_ID_LENGTH} characters."
+    )
+
 
 def validate_file_name(name: str) -> str:
     """
@@ -27,21 +105,21 @@ def validate_file_name(name: str) -> str:
     Raises:
         HTTPException: If file name is invalid
     """
-    if not name or not name.strip():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File name is required"
-        )
+    if not name:
+        raise _FILE_NAME_REQUIRED.with_traceback(None)
 
-    # Sanitize file name (remove path traversal attempts, special characters)
-    sanitized = re.sub(r'[^a-zA-Z0-9._-]', '_', name)
-    sanitized = sanitized[:255]  # Limit length
+    if len(name) > _MAX_RAW_FILE_NAME_LENGTH:
+        raise _FILE_NAME_TOO_LONG.with_traceback(None)
+
+    if name.isspace():
+        raise _FILE_NAME_REQUIRED.with_traceback(None)
+
+    # Sanitize file name (remove path traversal attempts, special characters).
+    # Substitution is per character, so truncating first gives the same result.
+    sanitized = _FILE_NAME_SANITIZE_RE.sub('_', name[:_MAX_FILE_NAME_LENGTH])
 
     if not sanitized:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file name"
-        )
+        raise _FILE_NAME_INVALID.with_traceback(None)
 
     return sanitized
 
@@ -60,10 +138,7 @@ def validate_file_size(size: int) -> int:
         HTTPException: If file size is invalid or too large
     """
     if not isinstance(size, int) or size <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size must be a positive integer"
-        )
+        raise _FILE_SIZE_INVALID.with_traceback(None)
 
     if size > Config.MAX_FILE_SIZE:
         raise HTTPException(
@@ -74,6 +149,7 @@ def validate_file_size(size: int) -> int:
     return size
 
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def validate_mime_type(mime_type: str) -> str:
     """
     Validate MIME type against whitelist.
@@ -87,21 +163,19 @@ def validate_mime_type(mime_type: str) -> str:
     Raises:
         HTTPException: If MIME type is not allowed
     """
-    if not mime_type or not mime_type.strip():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="MIME type is required"
-        )
+    if not mime_type or mime_type.isspace():
+        raise _MIME_TYPE_REQUIRED.with_traceback(None)
 
     if mime_type not in Config.ALLOWED_MIME_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"MIME type '{mime_type}' is not allowed. Allowed types: {', '.join(Config.ALLOWED_MIME_TYPES)}"
+            detail=f"MIME type '{mime_type}' is not allowed. Allowed types: {_ALLOWED_MIME_JOINED}"
         )
 
     return mime_type
 
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def validate_file_id(file_id: str) -> str:
     """
     Validate file ID format for Appwrite compatibility.
@@ -120,35 +194,27 @@ def validate_file_id(file_id: str) -> str:
     Raises:
         HTTPException: If file ID is invalid
     """
-    if not file_id or not file_id.strip():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File ID is required"
-        )
+    if not file_id:
+        raise _FILE_ID_REQUIRED.with_traceback(None)
 
-    file_id = file_id.strip()
+    # Check length (Appwrite max is 36 chars) before copying oversized input
+    if len(file_id) > _MAX_FILE_ID_LENGTH + _FILE_ID_WHITESPACE_SLACK:
+        raise _file_id_too_long(len(file_id))
 
-    # Check length (Appwrite max is 36 chars)
-    if len(file_id) > 36:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File ID is too long ({len(file_id)} chars). Maximum is 36 characters."
-        )
+    file_id = file_id.strip()
+    if not file_id:
+        raise _FILE_ID_REQUIRED.with_traceback(None)
+    if len(file_id) > _MAX_FILE_ID_LENGTH:
+        raise _file_id_too_long(len(file_id))
 
     # File ID should be alphanumeric with periods, hyphens, and underscores
     # Valid chars: a-z, A-Z, 0-9, period, hyphen, underscore
-    if not re.match(r'^[a-zA-Z0-9._-]+$', file_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file ID format. Only alphanumeric characters, periods, hyphens, and underscores are allowed."
-        )
+    if file_id.encode('ascii', 'replace').translate(None, _FILE_ID_ALLOWED):
+        raise _FILE_ID_INVALID.with_traceback(None)
 
     # Can't start with a special character (period, hyphen, underscore)
     if file_id and file_id[0] in ['.', '-', '_']:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File ID cannot start with a special character (period, hyphen, or underscore)."
-        )
+        raise _FILE_ID_BAD_START.with_traceback(None)
 
     return file_id
 
@@ -167,21 +233,23 @@ def validate_search_query(query: str, max_length: int = 500) -> str:
     Raises:
         HTTPException: If query is invalid
     """
-    if not query or not query.strip():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Search query cannot be empty"
-        )
+    if not query:
+        raise _QUERY_EMPTY.with_traceback(None)
 
-    if len(query) > max_length:
+    stripped = query.strip()
+    if not stripped:
+        raise _QUERY_EMPTY.with_traceback(None)
+
+    if len(stripped) > max_length:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Search query exceeds maximum length ({max_length} characters)"
         )
 
-    return query.strip()
+    return stripped
 
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def validate_user_id(user_id: str) -> str:
     """
     Validate user ID format.
@@ -195,18 +263,12 @@ def validate_user_id(user_id: str) -> str:
     Raises:
         HTTPException: If user ID is invalid
     """
-    if not user_id or not user_id.strip():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User ID is required"
-        )
+    if not user_id or user_id.isspace():
+        raise _USER_ID_REQUIRED.with_traceback(None)
 
     # User ID should be alphanumeric with hyphens and underscores
-    if not re.match(r'^[a-zA-Z0-9_-]+$', user_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid user ID format"
-        )
+    if user_id.encode('ascii', 'replace').translate(None, _USER_ID_ALLOWED):
+        raise _USER_ID_INVALID.with_traceback(None)
 
     return user_id
 
@@ -221,10 +283,7 @@ def sanitize_path(path: str) -> str:
     Returns:
         Sanitized path
     """
-    # Remove path traversal attempts
-    path = path.replace('..', '')
-    path = path.replace('//', '/')
-    # Remove leading/trailing slashes
-    path = path.strip('/')
-    return path
+    # Drop empty, current-directory and parent-directory segments in one pass;
+    # this also collapses repeated slashes and strips leading/trailing ones
+    return '/'.join(part for part in path.split('/') if part not in _UNSAFE_PATH_SEGMENTS)
 